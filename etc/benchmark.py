@@ -0,0 +1,352 @@
+'''
+Benchmarks for colors, map layout, interpolation and page rendering.
+
+Times the hot paths against `FontParts.ufo` and against synthetic scaled-up inputs
+(large object trees, long texts, fonts with many glyphs and masters).
+Results are saved as JSON and can be compared against a baseline:
+
+    python benchmark.py --save baseline.json
+    python benchmark.py --compare baseline.json
+
+'''
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+
+folder = os.path.dirname(os.path.abspath(__file__))
+for path in [folder, os.path.dirname(folder)]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# objects reloads fontPartsMap and pages, so import it first
+import objects
+import drawBot
+from fontParts.world import NewFont
+from fontPartsMap import FontPartsColorScheme, FontPartsMap
+from type import FontPartsLogoType
+from interpolation import InterpolationEngine, MultiMasterInstancer
+from pages import makePageJobs, renderPages, mergePages
+
+ufoPath = os.path.join(folder, 'FontParts.ufo')
+
+benchmarks = []
+
+def benchmark(name):
+    '''
+    Register a benchmark. The decorated function does the setup and returns the function to be timed.
+
+    '''
+    def register(makeFunc):
+        benchmarks.append((name, makeFunc))
+        return makeFunc
+    return register
+
+def inDrawing(func, pageSize=(1000, 1000)):
+    '''
+    Run a drawing function on a new page of a new drawing.
+
+    '''
+    def run():
+        drawBot.newDrawing()
+        drawBot.newPage(*pageSize)
+        func()
+        drawBot.endDrawing()
+    return run
+
+# ---------------
+# synthetic input
+# ---------------
+
+def makeTreeConnections(branches, nodeCount, root='font'):
+    '''
+    Make connections for a tree with a given number of branches per node, filled level by level up to `nodeCount` nodes.
+    Nodes are named after the root, so they all get the color of the root.
+
+    '''
+    connections = []
+    level = [root]
+    while len(connections) + 1 < nodeCount:
+        nextLevel = []
+        for parent in level:
+            for i in range(branches):
+                if len(connections) + 1 >= nodeCount:
+                    break
+                child = f'{parent}_{i}'
+                connections.append((parent, child))
+                nextLevel.append(child)
+        level = nextLevel
+    return connections
+
+def makeSyntheticFont(glyphCount, masters, contours=3, points=24, seed=0):
+    '''
+    Make a font with compatible random outlines in several master layers.
+
+    '''
+    rng = random.Random(seed)
+    font = NewFont()
+    font.info.unitsPerEm = 1000
+    font.info.xHeight = 500
+    font.info.capHeight = 700
+    font.info.ascender = 750
+    font.info.descender = -250
+    layers = {layerName: font.getLayer(layerName) if layerName == font.defaultLayer.name else font.newLayer(layerName) for layerName in masters}
+
+    for g in range(glyphCount):
+        glyphName = f'glyph{g:05d}'
+        for layerName, layer in layers.items():
+            glyph = layer.newGlyph(glyphName)
+            glyph.width = rng.randint(300, 800)
+            pen = glyph.getPointPen()
+            for c in range(contours):
+                pen.beginPath()
+                for p in range(points):
+                    segmentType = 'line' if p % 3 == 0 else None if p % 3 == 1 else 'curve'
+                    if p == points - 1 and segmentType is None:
+                        segmentType = 'line'
+                    pen.addPoint((rng.randint(0, 700), rng.randint(-200, 800)), segmentType)
+                pen.endPath()
+    return font
+
+# -----
+# color
+# -----
+
+@benchmark('color.makeColors')
+def benchColorMakeColors():
+    scheme = FontPartsColorScheme()
+    return scheme.makeColors
+
+@benchmark('color.makeTables')
+def benchColorMakeTables():
+    scheme = FontPartsColorScheme()
+    return scheme.makeTables
+
+@benchmark('color.paletteAccess')
+def benchColorPaletteAccess():
+    scheme = FontPartsColorScheme()
+    names = list(scheme.colors.keys())
+    def run():
+        for i in range(1000):
+            table = scheme.colorsRGB
+            shadowTable = scheme.getTable('RGB', 'shadow')
+            for obj in names:
+                table[obj]
+                shadowTable[obj]
+    return run
+
+# ---
+# map
+# ---
+
+@benchmark('map.makePositions')
+def benchMapMakePositions():
+    M = FontPartsMap()
+    return lambda: M.makePositions((0, 0))
+
+@benchmark('map.draw')
+def benchMapDraw():
+    M = FontPartsMap()
+    def run():
+        # start from scratch every time
+        M.invalidateCaches()
+        M.draw((0, 0))
+    return inDrawing(run)
+
+@benchmark('map.drawCached')
+def benchMapDrawCached():
+    M = FontPartsMap()
+    return inDrawing(lambda: M.draw((0, 0)))
+
+@benchmark('map.large.makePositions')
+def benchMapLargeMakePositions():
+    M = FontPartsMap()
+    # 5 full levels of 5 branches, growing linearly with the scale
+    M.connections = makeTreeConnections(5, 3906 * options.scale)
+    M.layoutMode = 'radial'
+    return lambda: M.makePositions((0, 0))
+
+@benchmark('map.large.draw')
+def benchMapLargeDraw():
+    M = FontPartsMap()
+    # 4 full levels of 5 branches, growing linearly with the scale
+    M.connections = makeTreeConnections(5, 781 * options.scale)
+    M.layoutMode = 'radial'
+    def run():
+        M.invalidateCaches()
+        M.draw((0, 0))
+    return inDrawing(run)
+
+# --------
+# logotype
+# --------
+
+def makeLogoType(txt=None):
+    L = FontPartsLogoType.fromPath(ufoPath)
+    # layers are a class attribute, so give each logotype its own copy
+    L.layers = dict(L.layers)
+    if txt is not None:
+        L.txt = txt
+    L.getGlyphs(L.glyphNames)
+    return L
+
+def registerLogoTypeBenchmarks():
+    drawMethods = sorted(attr for attr in dir(FontPartsLogoType) if attr.startswith('draw') and attr != 'draw')
+    for prefix, txt in [('logotype', None), ('logotype.longText', 'FontParts' * 50)]:
+        for attr in drawMethods:
+            def makeFunc(attr=attr, txt=txt):
+                L = makeLogoType(txt)
+                return inDrawing(getattr(L, attr), (10000, 2000))
+            benchmark(f'{prefix}.{attr}')(makeFunc)
+
+        def makeFunc(txt=txt):
+            L = makeLogoType(txt)
+            for layer in L.layers:
+                L.layers[layer] = True
+            return inDrawing(lambda: L.draw((0, 0)), (10000, 2000))
+        benchmark(f'{prefix}.draw')(makeFunc)
+
+registerLogoTypeBenchmarks()
+
+# -------------
+# interpolation
+# -------------
+
+@benchmark('interpolation.engine.manyGlyphs')
+def benchInterpolationEngine():
+    font = makeSyntheticFont(500 * options.scale, ['public.default', 'bold'])
+    engine = InterpolationEngine(font, ('public.default', 'bold'))
+    engine.loadFont()
+    glyphNames = list(engine.glyphs.keys())
+    return lambda: engine.instances(glyphNames, 0.5)
+
+@benchmark('interpolation.instancer.manyMasters')
+def benchInterpolationInstancer():
+    masters = {
+        'public.default' : {},
+        'bold'           : {'weight': 1},
+        'wide'           : {'width': 1},
+        'boldwide'       : {'weight': 1, 'width': 1},
+        'semibold'       : {'weight': 0.5},
+    }
+    font = makeSyntheticFont(200 * options.scale, list(masters.keys()))
+    instancer = MultiMasterInstancer(font, masters)
+    glyphNames = font.keys()
+    instancer.loadGlyphs(glyphNames)
+    locations = [{'weight': w / 4, 'width': w / 8} for w in range(5)]
+    return lambda: instancer.instances(glyphNames, locations)
+
+# -----
+# pages
+# -----
+
+@benchmark('pages.objects')
+def benchPages():
+    jobs = makePageJobs(list(objects.typeAttrs['layers'].keys()), objects.steps, True)
+    # removed with its contents once the benchmark is done with `run`
+    outputFolder = tempfile.TemporaryDirectory()
+    pagesFolder = os.path.join(outputFolder.name, 'pages')
+    def run():
+        pagePaths = renderPages(jobs, ufoPath, objects.typeAttrs, objects.mapAttrs, pagesFolder, processes=options.processes)
+        mergePages(pagePaths, os.path.join(outputFolder.name, 'FontParts.gif'))
+    return run
+
+# ------
+# runner
+# ------
+
+def timeFunction(func, repeat):
+    times = []
+    for i in range(repeat):
+        t = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t)
+    return {
+        'min'    : min(times),
+        'median' : statistics.median(times),
+        'mean'   : statistics.mean(times),
+        'repeat' : repeat,
+    }
+
+def runBenchmarks(pattern=None, repeat=5):
+    results = {}
+    for name, makeFunc in benchmarks:
+        if pattern and pattern not in name:
+            continue
+        func = makeFunc()
+        # warm up caches and imports once before timing
+        func()
+        results[name] = timeFunction(func, repeat)
+        print(f"{name:50} {results[name]['min'] * 1000:10.3f} ms")
+    return results
+
+def compareResults(results, baseline, threshold=0.1):
+    '''
+    Compare the fastest times of all benchmarks against a baseline.
+    Returns a list of benchmark names which are slower than the baseline by more than `threshold`.
+
+    '''
+    regressions = []
+    print()
+    print(f"{'benchmark':50} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['min']
+        after = result['min']
+        change = (after - before) / before if before else 0
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = ' slower'
+        print(f"{name:50} {before * 1000:10.3f} {after * 1000:10.3f} {change:+8.1%}{flag}")
+    return regressions
+
+def parseArguments(args=None):
+    parser = argparse.ArgumentParser(description='Time the FontParts map, logotype and page rendering.')
+    parser.add_argument('--filter', '-k', help='only run benchmarks whose name contains this text')
+    parser.add_argument('--repeat', '-r', type=int, default=5, help='number of timed runs per benchmark')
+    parser.add_argument('--scale', type=int, default=1, help='size factor for synthetic inputs')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes for page rendering')
+    parser.add_argument('--save', help='save results to a JSON file')
+    parser.add_argument('--compare', help='compare results against a baseline JSON file')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative slowdown reported as a regression')
+    return parser.parse_args(args)
+
+options = parseArguments([])
+
+if __name__ == '__main__':
+
+    options = parseArguments()
+
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        # synthetic inputs of another size can't be compared
+        if baseline.get('scale', 1) != options.scale:
+            print(f"The baseline was recorded with --scale {baseline.get('scale', 1)}, not {options.scale}.")
+            sys.exit(2)
+
+    results = runBenchmarks(options.filter, options.repeat)
+
+    if options.save:
+        data = {
+            'python'     : platform.python_version(),
+            'platform'   : platform.platform(),
+            'scale'      : options.scale,
+            'benchmarks' : results,
+        }
+        with open(options.save, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    if options.compare:
+        regressions = compareResults(results, baseline['benchmarks'], options.threshold)
+        if regressions:
+            print(f'\n{len(regressions)} benchmarks are slower than the baseline.')
+            sys.exit(1)
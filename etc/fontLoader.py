@@ -0,0 +1,201 @@
+'''
+Selective loading of UFO fonts.
+
+Only the glyphs needed to set a given text are read, from the layers which are actually used.
+
+'''
+
+from fontTools.agl import UV2AGL
+from fontTools.ufoLib import UFOReader
+from fontParts.world import NewFont
+from geometryCache import GeometryCache
+
+
+def getGlyphNameCandidates(uni):
+    '''
+    Get the usual glyph names for a unicode value, in order of preference.
+
+    '''
+    candidates = []
+    if uni in UV2AGL:
+        candidates.append(UV2AGL[uni])
+    if uni <= 0xFFFF:
+        candidates.append('uni%04X' % uni)
+    else:
+        candidates.append('u%05X' % uni)
+    return candidates
+
+
+def resolveGlyphNames(glyphSet, text):
+    '''
+    Get the glyph names for all characters in a text.
+
+    Names are looked up in the glyph set's `contents.plist` first. Only if a character can't be
+    found this way, the unicodes of all glyphs are read to build a cmap.
+
+    '''
+    glyphNames = {}
+    missing = []
+    for char in text:
+        uni = ord(char)
+        if uni in glyphNames:
+            continue
+        for glyphName in getGlyphNameCandidates(uni):
+            if glyphName in glyphSet:
+                glyphNames[uni] = glyphName
+                break
+        else:
+            missing.append(uni)
+
+    if missing:
+        cmap = {}
+        for glyphName, unicodes in glyphSet.getUnicodes().items():
+            for uni in unicodes:
+                cmap.setdefault(uni, glyphName)
+        for uni in missing:
+            if uni in cmap:
+                glyphNames[uni] = cmap[uni]
+
+    return [glyphNames[ord(char)] for char in text if ord(char) in glyphNames]
+
+
+def openFontSubset(ufoPath, text=None, glyphNames=None, layerNames=None, useCache=False):
+    '''
+    Open a UFO reading only the glyphs for the given text and/or glyph names.
+
+    Glyphs are read only from the given layers (all layers listed in `layercontents.plist` by default).
+    Base glyphs of components are read too. Font info, groups and kerning are always read.
+
+    With `useCache`, everything is read from a compiled geometry cache next to the UFO,
+    and only files which have changed since the cache was saved are parsed.
+
+    Returns a `fontParts` font object which is not linked to the UFO on disk.
+
+    '''
+    if useCache:
+        reader = GeometryCache(ufoPath)
+    else:
+        reader = UFOReader(ufoPath, validate=False)
+    defaultLayerName = reader.getDefaultLayerName()
+    if layerNames is None:
+        layerNames = reader.getLayerNames()
+    layerNames = [layerName for layerName in reader.getLayerNames() if layerName in layerNames or layerName == defaultLayerName]
+
+    glyphNames = list(glyphNames) if glyphNames is not None else []
+    if text:
+        glyphNames += resolveGlyphNames(reader.getGlyphSet(defaultLayerName), text)
+
+    font = NewFont()
+    font.defaultLayer.name = defaultLayerName
+    reader.readInfo(font.info.naked())
+    font.groups.update(reader.readGroups())
+    font.kerning.update(reader.readKerning())
+
+    for layerName in layerNames:
+        glyphSet = reader.getGlyphSet(layerName)
+        if layerName == defaultLayerName:
+            layer = font.defaultLayer
+        else:
+            layer = font.newLayer(layerName)
+
+        readGlyphs(layer, glyphSet, glyphNames)
+
+    if useCache:
+        reader.save()
+
+    return font
+
+
+def readGlyphs(layer, glyphSet, glyphNames, replace=()):
+    '''
+    Read glyphs and the base glyphs of their components into a layer.
+
+    Glyphs which are already in the layer are skipped, unless they are listed in `replace`.
+    Replaced glyphs which no longer exist in the glyph set are removed from the layer.
+
+    '''
+    replace = set(replace)
+    queue = list(glyphNames)
+    while queue:
+        glyphName = queue.pop()
+        if glyphName in replace:
+            replace.discard(glyphName)
+            if glyphName in layer:
+                layer.removeGlyph(glyphName)
+        if glyphName in layer or glyphName not in glyphSet:
+            continue
+        glyph = layer.newGlyph(glyphName).naked()
+        glyphSet.readGlyph(glyphName, glyph, glyph.getPointPen())
+        # component base glyphs are needed to draw the glyph
+        queue += [component.baseGlyph for component in glyph.components]
+
+
+def readLayers(font, ufoPath, layerNames, useCache=False):
+    '''
+    Read more layers into a font opened with `openFontSubset`.
+
+    Only glyphs which are already in the font are read. Layers which are already in the font
+    or don't exist in the UFO are skipped. Returns the names of the layers which were read.
+
+    '''
+    if useCache:
+        reader = GeometryCache(ufoPath)
+    else:
+        reader = UFOReader(ufoPath, validate=False)
+
+    glyphNames = set()
+    for layer in font.layers:
+        glyphNames.update(layer.keys())
+
+    added = []
+    for layerName in reader.getLayerNames():
+        if layerName not in layerNames or layerName in font.layerOrder:
+            continue
+        readGlyphs(font.newLayer(layerName), reader.getGlyphSet(layerName), glyphNames)
+        added.append(layerName)
+
+    if useCache:
+        reader.save()
+
+    return added
+
+
+def updateFontSubset(font, ufoPath, glyphs=None, info=False, groups=False, kerning=False, useCache=False):
+    '''
+    Read changed data from a UFO into a font opened with `openFontSubset`.
+
+    `glyphs` is a dict of layer names and changed glyph names. Only glyphs which are
+    already in the font are read again; changes to other glyphs and layers are ignored.
+    Font info, groups and kerning are read again if the corresponding flags are set.
+
+    Returns a set of the glyph names which were updated in any layer.
+
+    '''
+    if useCache:
+        reader = GeometryCache(ufoPath)
+    else:
+        reader = UFOReader(ufoPath, validate=False)
+
+    if info:
+        reader.readInfo(font.info.naked())
+    if groups:
+        font.groups.clear()
+        font.groups.update(reader.readGroups())
+    if kerning:
+        font.kerning.clear()
+        font.kerning.update(reader.readKerning())
+
+    updated = set()
+    for layerName, glyphNames in (glyphs or {}).items():
+        if layerName not in font.layerOrder:
+            continue
+        layer = font.getLayer(layerName)
+        glyphNames = [glyphName for glyphName in glyphNames if glyphName in layer]
+        if glyphNames:
+            readGlyphs(layer, reader.getGlyphSet(layerName), glyphNames, replace=glyphNames)
+            updated.update(glyphNames)
+
+    if useCache:
+        reader.save()
+
+    return updated
@@ -0,0 +1,384 @@
+'''
+Compiled geometry cache for UFO fonts.
+
+Point coordinates of all glyphs in all layers are stored in one flat array of doubles,
+in a binary file next to the UFO. Everything else (point types, contour boundaries,
+anchors, components, advance widths, font info, groups and kerning) is stored in a JSON index
+at the start of the file. The coordinate array is memory-mapped when the cache is loaded.
+
+Each glyph is invalidated separately by the modification time and size of its `.glif` file,
+and the plists by their own. Only out-of-date entries are read from the UFO again.
+
+'''
+
+import os
+import json
+import mmap
+import stat
+import struct
+import plistlib
+import tempfile
+from array import array
+from fontTools.ufoLib import UFOReader
+
+
+MAGIC = b'FPGC'
+VERSION = 1
+HEADER = '<4sII'
+
+segmentTypeCodes = {
+    'move'   : 'm',
+    'line'   : 'l',
+    'curve'  : 'c',
+    'qcurve' : 'q',
+    None     : 'o',
+}
+
+segmentTypes = {code: segmentType for segmentType, code in segmentTypeCodes.items()}
+
+
+def getStamp(path):
+    '''
+    Get the modification time and size of a file, or `None` if it doesn't exist.
+
+    '''
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [info.st_mtime_ns, info.st_size]
+
+
+def getFileMode(ufoPath):
+    '''
+    Get the permissions for a new cache file: the same as the UFO's `metainfo.plist`,
+    or the default for new files if it can't be read.
+
+    '''
+    try:
+        return stat.S_IMODE(os.stat(os.path.join(ufoPath, 'metainfo.plist')).st_mode)
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def toNumber(value):
+    return int(value) if value.is_integer() else value
+
+
+class AttributeRecorder:
+
+    '''
+    Collect the attributes set by `UFOReader.readInfo` and `GlyphSet.readGlyph`.
+
+    '''
+
+
+class CompilingPointPen:
+
+    '''
+    A point pen which records contours as a flat list of coordinates and strings of point types.
+
+    '''
+
+    def __init__(self):
+        self.coords = []
+        self.contours = []
+        self.components = []
+
+    def beginPath(self, identifier=None, **kwargs):
+        self.types = []
+        self.smooth = []
+
+    def addPoint(self, pt, segmentType=None, smooth=False, name=None, identifier=None, **kwargs):
+        self.coords.extend(pt)
+        self.types.append(segmentTypeCodes[segmentType])
+        self.smooth.append('1' if smooth else '0')
+
+    def endPath(self):
+        self.contours.append([''.join(self.types), ''.join(self.smooth)])
+
+    def addComponent(self, baseGlyphName, transformation, identifier=None, **kwargs):
+        self.components.append([baseGlyphName, list(transformation)])
+
+
+class CachedGlyphSet:
+
+    '''
+    A glyph set which reads glyphs from a geometry cache, like a `fontTools.ufoLib.glifLib.GlyphSet`.
+
+    '''
+
+    def __init__(self, cache, layerName):
+        self.cache = cache
+        self.layerName = layerName
+        self.contents = cache.getContents(layerName)
+
+    def __contains__(self, glyphName):
+        return glyphName in self.contents
+
+    def __len__(self):
+        return len(self.contents)
+
+    def keys(self):
+        return list(self.contents.keys())
+
+    def getUnicodes(self, glyphNames=None):
+        if glyphNames is None:
+            glyphNames = self.contents.keys()
+        return {glyphName: self.cache.getGlyphEntry(self.layerName, glyphName)['unicodes'] for glyphName in glyphNames}
+
+    def readGlyph(self, glyphName, glyphObject=None, pointPen=None):
+        entry = self.cache.getGlyphEntry(self.layerName, glyphName)
+
+        if glyphObject is not None:
+            glyphObject.width = entry['width']
+            glyphObject.height = entry['height']
+            glyphObject.unicodes = list(entry['unicodes'])
+            if entry['anchors']:
+                glyphObject.anchors = entry['anchors']
+            if entry['guidelines']:
+                glyphObject.guidelines = entry['guidelines']
+
+        if pointPen is not None:
+            coords = self.cache.getCoords(entry)
+            i = 0
+            for types, smooth in entry['contours']:
+                pointPen.beginPath()
+                for pointType, pointSmooth in zip(types, smooth):
+                    pointPen.addPoint((toNumber(coords[i]), toNumber(coords[i + 1])), segmentTypes[pointType], pointSmooth == '1')
+                    i += 2
+                pointPen.endPath()
+            for baseGlyphName, transformation in entry['components']:
+                pointPen.addComponent(baseGlyphName, tuple(transformation))
+
+
+class GeometryCache:
+
+    '''
+    A compiled cache of a UFO which can be read like a `fontTools.ufoLib.UFOReader`.
+
+    The cache is saved to `<ufoPath>.geometry` by default. Call `save` after reading
+    to write any entries which were compiled from the UFO.
+
+    '''
+
+    def __init__(self, ufoPath, cachePath=None):
+        self.ufoPath = os.path.normpath(ufoPath)
+        self.cachePath = cachePath if cachePath is not None else self.ufoPath + '.geometry'
+        self.index = {'plists': {}, 'glyphs': {}}
+        self.base = array('d')
+        self.extra = array('d')
+        self.modified = False
+        self._mmap = None
+        self._reader = None
+        self.load()
+
+    @property
+    def reader(self):
+        '''
+        A reader for the UFO itself, only created when something has to be compiled.
+
+        '''
+        if self._reader is None:
+            self._reader = UFOReader(self.ufoPath, validate=False)
+        return self._reader
+
+    # -------
+    # storage
+    # -------
+
+    def load(self):
+        if not os.path.exists(self.cachePath):
+            return
+        with open(self.cachePath, 'rb') as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty file
+                return
+        magic, version, indexLength = struct.unpack_from(HEADER, mm, 0)
+        if magic != MAGIC or version != VERSION:
+            mm.close()
+            return
+        start = struct.calcsize(HEADER)
+        self.index = json.loads(mm[start:start + indexLength])
+        offset = (start + indexLength + 7) // 8 * 8
+        self._mmap = mm
+        self.base = memoryview(mm)[offset:].cast('d')
+
+    def close(self):
+        '''
+        Release the memory-mapped cache file.
+
+        '''
+        if self._mmap is not None:
+            self.base.release()
+            self._mmap.close()
+            self._mmap = None
+        self.base = array('d')
+
+    def getCoords(self, entry):
+        '''
+        Get the flat list of point coordinates of a glyph entry.
+
+        '''
+        start = entry['start']
+        end = start + sum(len(types) for types, smooth in entry['contours']) * 2
+        baseLength = len(self.base)
+        if start >= baseLength:
+            return self.extra[start - baseLength:end - baseLength].tolist()
+        return self.base[start:end].tolist()
+
+    def save(self):
+        '''
+        Write the cache file if anything was compiled.
+        Coordinates of outdated and deleted glyphs are dropped.
+
+        '''
+        if not self.modified:
+            return
+
+        coords = array('d')
+        for layerName, glyphs in self.index['glyphs'].items():
+            contents = self.getContents(layerName) if layerName in self.getLayerDirectories() else {}
+            for glyphName in list(glyphs):
+                if glyphName not in contents:
+                    del glyphs[glyphName]
+                    continue
+                entry = glyphs[glyphName]
+                values = self.getCoords(entry)
+                entry['start'] = len(coords)
+                coords.extend(values)
+
+        indexData = json.dumps(self.index, separators=(',', ':')).encode('utf-8')
+        header = struct.pack(HEADER, MAGIC, VERSION, len(indexData))
+        padding = b'\0' * ((len(header) + len(indexData) + 7) // 8 * 8 - len(header) - len(indexData))
+
+        # write to a temporary file first, so other processes never see a partial cache
+        folder = os.path.dirname(os.path.abspath(self.cachePath))
+        fd, tempPath = tempfile.mkstemp(dir=folder, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header + indexData + padding)
+            f.write(coords.tobytes())
+        # temporary files are only readable by their owner
+        os.chmod(tempPath, getFileMode(self.ufoPath))
+        os.replace(tempPath, self.cachePath)
+
+        self.close()
+        self.base = coords
+        self.extra = array('d')
+        self.modified = False
+
+    def getPlist(self, fileName, readFunc):
+        '''
+        Get the data of a plist in the UFO, compiling it with `readFunc` if the file has changed.
+
+        '''
+        stamp = getStamp(os.path.join(self.ufoPath, fileName))
+        entry = self.index['plists'].get(fileName)
+        if entry is None or entry['stamp'] != stamp:
+            entry = self.index['plists'][fileName] = {'stamp': stamp, 'data': readFunc()}
+            self.modified = True
+        return entry['data']
+
+    # ------
+    # layers
+    # ------
+
+    def getLayerDirectories(self):
+        '''
+        Get a dict of layer names and directory names, in layer order.
+
+        '''
+        def readLayerContents():
+            path = os.path.join(self.ufoPath, 'layercontents.plist')
+            if not os.path.exists(path):
+                return [[self.reader.getDefaultLayerName(), 'glyphs']]
+            with open(path, 'rb') as f:
+                return plistlib.load(f)
+        return dict(self.getPlist('layercontents.plist', readLayerContents))
+
+    def getLayerNames(self):
+        return list(self.getLayerDirectories().keys())
+
+    def getDefaultLayerName(self):
+        for layerName, directory in self.getLayerDirectories().items():
+            if directory == 'glyphs':
+                return layerName
+
+    def getContents(self, layerName):
+        '''
+        Get a dict of glyph names and file names in a layer.
+
+        '''
+        directory = self.getLayerDirectories()[layerName]
+        def readContents():
+            with open(os.path.join(self.ufoPath, directory, 'contents.plist'), 'rb') as f:
+                return plistlib.load(f)
+        return self.getPlist(f'{directory}/contents.plist', readContents)
+
+    def getGlyphSet(self, layerName=None):
+        if layerName is None:
+            layerName = self.getDefaultLayerName()
+        return CachedGlyphSet(self, layerName)
+
+    # ------
+    # glyphs
+    # ------
+
+    def getGlyphEntry(self, layerName, glyphName):
+        '''
+        Get the compiled data of a glyph, compiling it again if its `.glif` file has changed.
+
+        '''
+        directory = self.getLayerDirectories()[layerName]
+        fileName = self.getContents(layerName)[glyphName]
+        stamp = getStamp(os.path.join(self.ufoPath, directory, fileName))
+        glyphs = self.index['glyphs'].setdefault(layerName, {})
+        entry = glyphs.get(glyphName)
+        if entry is None or entry['stamp'] != stamp:
+            entry = glyphs[glyphName] = self.compileGlyph(layerName, glyphName, stamp)
+        return entry
+
+    def compileGlyph(self, layerName, glyphName, stamp):
+        glyph = AttributeRecorder()
+        pen = CompilingPointPen()
+        self.reader.getGlyphSet(layerName).readGlyph(glyphName, glyph, pen)
+
+        start = len(self.base) + len(self.extra)
+        self.extra.extend(pen.coords)
+        self.modified = True
+
+        return {
+            'stamp'      : stamp,
+            'width'      : getattr(glyph, 'width', 0),
+            'height'     : getattr(glyph, 'height', 0),
+            'unicodes'   : getattr(glyph, 'unicodes', []),
+            'anchors'    : getattr(glyph, 'anchors', []),
+            'guidelines' : getattr(glyph, 'guidelines', []),
+            'start'      : start,
+            'contours'   : pen.contours,
+            'components' : pen.components,
+        }
+
+    # ---------------
+    # font-level data
+    # ---------------
+
+    def readInfo(self, info):
+        def readInfo():
+            recorder = AttributeRecorder()
+            self.reader.readInfo(recorder)
+            return vars(recorder)
+        for attr, value in self.getPlist('fontinfo.plist', readInfo).items():
+            setattr(info, attr, value)
+
+    def readGroups(self):
+        return self.getPlist('groups.plist', self.reader.readGroups)
+
+    def readKerning(self):
+        def readKerning():
+            return [[first, second, value] for (first, second), value in self.reader.readKerning().items()]
+        return {(first, second): value for first, second, value in self.getPlist('kerning.plist', readKerning)}
@@ -0,0 +1,612 @@
+'''
+Batch interpolation of glyph outlines.
+
+Point coordinates of each master layer are stored once in flat contiguous arrays,
+so that an instance of a glyph is calculated from one slice of each array.
+The slices of all requested glyphs are interpolated together in one pass,
+with NumPy if it is installed.
+
+'''
+
+from math import floor
+from array import array
+from operator import add, mul
+from itertools import repeat
+from fontTools.misc.roundTools import otRound
+from fontTools.misc.vector import Vector
+from fontTools.varLib.models import VariationModel
+from fontTools.pens.pointPen import PointToSegmentPen
+from fontTools.pens.transformPen import TransformPen
+from fontTools.pens.recordingPen import RecordingPen, RecordingPointPen
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class InstancePoint:
+
+    __slots__ = 'x', 'y', 'type', 'smooth'
+
+    def __init__(self, x, y, segmentType, smooth):
+        self.x = x
+        self.y = y
+        self.type = segmentType if segmentType is not None else 'offcurve'
+        self.smooth = smooth
+
+    @property
+    def position(self):
+        return self.x, self.y
+
+
+class InstanceBPoint:
+
+    __slots__ = 'anchor', 'bcpIn', 'bcpOut', 'type'
+
+    def __init__(self, anchor, bcpIn, bcpOut, bPointType):
+        self.anchor = anchor
+        self.bcpIn = bcpIn
+        self.bcpOut = bcpOut
+        self.type = bPointType
+
+
+class InstanceContour:
+
+    def __init__(self, points, closed=True):
+        self.points = points
+        self.closed = closed
+
+    @property
+    def bPoints(self):
+        '''
+        Get on-curve points with their handles relative to the anchor,
+        like `fontParts` bPoints.
+
+        '''
+        points = self.points
+        n = len(points)
+        bPoints = []
+        for i, pt in enumerate(points):
+            if pt.type == 'offcurve':
+                continue
+            if not self.closed and (i == 0 or i == n - 1):
+                prev = nxt = None
+            else:
+                prev = points[i - 1]
+                nxt = points[(i + 1) % n]
+            bcpIn = bcpOut = 0, 0
+            if prev is not None and prev.type == 'offcurve':
+                bcpIn = prev.x - pt.x, prev.y - pt.y
+            if nxt is not None and nxt.type == 'offcurve':
+                bcpOut = nxt.x - pt.x, nxt.y - pt.y
+            bPointType = 'curve' if pt.smooth else 'corner'
+            bPoints.append(InstanceBPoint((pt.x, pt.y), bcpIn, bcpOut, bPointType))
+        return bPoints
+
+    def drawPoints(self, pointPen):
+        pointPen.beginPath()
+        for pt in self.points:
+            pointPen.addPoint((pt.x, pt.y), segmentType=None if pt.type == 'offcurve' else pt.type, smooth=pt.smooth)
+        pointPen.endPath()
+
+    def draw(self, pen):
+        self.drawPoints(PointToSegmentPen(pen))
+
+
+class InstanceComponent:
+
+    def __init__(self, baseGlyph, transformation):
+        self.baseGlyph = baseGlyph
+        self.transformation = transformation
+        # the interpolated base glyph, linked by the engine which made the instance
+        self.baseInstance = None
+
+    def drawPoints(self, pointPen):
+        pointPen.addComponent(self.baseGlyph, self.transformation)
+
+    def draw(self, pen):
+        '''
+        Draw the outline of the interpolated base glyph with the component's transformation.
+
+        '''
+        if self.baseInstance is None:
+            pen.addComponent(self.baseGlyph, self.transformation)
+        else:
+            self.baseInstance.draw(TransformPen(pen, self.transformation))
+
+
+class InstanceGlyph:
+
+    '''
+    A lightweight interpolated glyph which can be drawn like a `fontParts` glyph.
+    Components are drawn decomposed, using the interpolated base glyphs.
+
+    '''
+
+    def __init__(self, name, unicode, width, contours, components=()):
+        self.name = name
+        self.unicode = unicode
+        self.width = width
+        self.contours = contours
+        self.components = list(components)
+
+    def __len__(self):
+        return len(self.contours)
+
+    def __iter__(self):
+        return iter(self.contours)
+
+    def drawPoints(self, pointPen):
+        for contour in self.contours:
+            contour.drawPoints(pointPen)
+        for component in self.components:
+            component.drawPoints(pointPen)
+
+    def draw(self, pen):
+        segmentPen = PointToSegmentPen(pen)
+        for contour in self.contours:
+            contour.drawPoints(segmentPen)
+        for component in self.components:
+            component.draw(pen)
+
+    @property
+    def outlineKey(self):
+        '''
+        The drawing of the outline as a tuple of pen calls, with components decomposed.
+        Glyphs with the same outline have the same key. Made when first needed.
+
+        '''
+        key = getattr(self, '_outlineKey', None)
+        if key is None:
+            pen = RecordingPen()
+            self.draw(pen)
+            key = self._outlineKey = tuple(pen.value)
+        return key
+
+
+def readGlyphStructure(glyph):
+    '''
+    Read the point structure, components and coordinates of a glyph.
+
+    Returns a list of contours, each a list of `(segmentType, smooth)` tuples,
+    a list of component base glyph names, and a flat list of coordinates
+    `[x0, y0, x1, y1, …, xx, xy, yx, yy, dx, dy, …, width]`: the points of all contours,
+    then the transformation of each component, then the advance width.
+
+    '''
+    pen = RecordingPointPen()
+    glyph.drawPoints(pen)
+    structure = []
+    components = []
+    coords = []
+    transformations = []
+    contour = None
+    for method, args, kwargs in pen.value:
+        if method == 'beginPath':
+            contour = []
+        elif method == 'addPoint':
+            (x, y), segmentType, smooth, name = args
+            contour.append((segmentType, smooth))
+            coords.extend((x, y))
+        elif method == 'endPath':
+            structure.append(contour)
+            contour = None
+        elif method == 'addComponent':
+            baseGlyph, transformation = args
+            components.append(baseGlyph)
+            transformations.extend(transformation)
+    coords.extend(transformations)
+    coords.append(glyph.width)
+    return structure, components, coords
+
+
+def makeInstanceGlyph(glyphName, unicode, structure, components, coords, start=0):
+    '''
+    Make an `InstanceGlyph` from a point structure, component base glyphs and a flat list of coordinates.
+
+    '''
+    contours = []
+    i = start
+    for contour in structure:
+        points = []
+        for segmentType, smooth in contour:
+            points.append(InstancePoint(coords[i], coords[i + 1], segmentType, smooth))
+            i += 2
+        closed = not contour or contour[0][0] != 'move'
+        contours.append(InstanceContour(points, closed))
+    instanceComponents = []
+    for baseGlyph in components:
+        instanceComponents.append(InstanceComponent(baseGlyph, tuple(coords[i:i + 6])))
+        i += 6
+    return InstanceGlyph(glyphName, unicode, coords[i], contours, instanceComponents)
+
+
+def linkComponents(glyphs):
+    '''
+    Link the components of interpolated glyphs to the interpolated base glyphs in the same dict.
+
+    '''
+    for glyph in glyphs.values():
+        for component in glyph.components:
+            component.baseInstance = glyphs.get(component.baseGlyph)
+
+
+def checkCompatibility(glyphName, structures):
+    '''
+    Raise an error if the point structures or components of a glyph in several masters don't match.
+
+    '''
+    segmentTypes = None
+    for layerName, (structure, components) in structures.items():
+        types = [[t for t, s in c] for c in structure], components
+        if segmentTypes is None:
+            segmentTypes = types
+            firstLayerName = layerName
+        elif types != segmentTypes:
+            raise ValueError(f"Glyph '{glyphName}' is not compatible between layers '{firstLayerName}' and '{layerName}'.")
+
+
+class BaseInterpolator:
+
+    '''
+    Glyph loading shared by `InterpolationEngine` and `MultiMasterInstancer`.
+    Subclasses implement `loadGlyph` and `getComponents`, and keep loaded glyphs in the `glyphs` dict.
+
+    '''
+
+    def clear(self):
+        '''
+        Remove all loaded glyphs. Call this after making changes to the font.
+
+        '''
+        self.glyphs = {}
+
+    def removeGlyphs(self, glyphNames):
+        '''
+        Remove some loaded glyphs, so they are loaded again from the font when needed.
+        Returns the names of the glyphs which were loaded.
+
+        '''
+        return [glyphName for glyphName in glyphNames if self.glyphs.pop(glyphName, None) is not None]
+
+    def loadGlyph(self, glyphName):
+        raise NotImplementedError
+
+    def loadGlyphs(self, glyphNames):
+        for glyphName in glyphNames:
+            self.loadGlyph(glyphName)
+
+    def loadBaseGlyphs(self, components):
+        # base glyphs are needed to draw the components
+        for baseGlyph in components:
+            if baseGlyph in self.font:
+                self.loadGlyph(baseGlyph)
+
+    def getComponents(self, glyphName):
+        '''
+        Get the base glyph names of the components of a loaded glyph.
+
+        '''
+        raise NotImplementedError
+
+    def getBaseGlyphs(self, glyphNames):
+        '''
+        Get the given glyph names and the base glyphs of their components, recursively.
+        Base glyphs which have been removed since are loaded again.
+
+        '''
+        glyphNames = set(glyphNames)
+        queue = list(glyphNames)
+        while queue:
+            for baseGlyph in self.getComponents(queue.pop()):
+                if baseGlyph not in self.glyphs and baseGlyph in self.font:
+                    self.loadGlyph(baseGlyph)
+                if baseGlyph in self.glyphs and baseGlyph not in glyphNames:
+                    glyphNames.add(baseGlyph)
+                    queue.append(baseGlyph)
+        return glyphNames
+
+
+class InterpolationEngine(BaseInterpolator):
+
+    '''
+    Interpolate glyphs between two master layers of a font.
+
+    The coordinates of all loaded glyphs are kept in two contiguous arrays:
+    the first master, and the difference between the second and the first master.
+    Instances are calculated with `a + (b - a) * t` over the slices of the requested glyphs, in one pass.
+
+    Coordinates are rounded to integers by default, like `fontParts` interpolation.
+
+    '''
+
+    def __init__(self, font, masters=('regular', 'bold'), round=True):
+        self.font = font
+        self.masters = tuple(masters)
+        self.round = round
+        self.clear()
+
+    def clear(self):
+        super().clear()
+        self.base = array('d')
+        self.delta = array('d')
+
+    def removeGlyphs(self, glyphNames):
+        # coordinates of removed glyphs are removed from the arrays too
+        removed = super().removeGlyphs(glyphNames)
+        if removed:
+            self.compact()
+        return removed
+
+    def compact(self):
+        '''
+        Rebuild the coordinate arrays with only the coordinates of loaded glyphs.
+
+        '''
+        base = array('d')
+        delta = array('d')
+        glyphs = {}
+        for glyphName, (start, end, structure, components, unicode) in self.glyphs.items():
+            glyphs[glyphName] = len(base), len(base) + end - start, structure, components, unicode
+            base.extend(self.base[start:end])
+            delta.extend(self.delta[start:end])
+        self.base = base
+        self.delta = delta
+        self.glyphs = glyphs
+
+    def loadGlyph(self, glyphName):
+        if glyphName in self.glyphs:
+            return
+
+        master1, master2 = self.masters
+        g1 = self.font[glyphName].getLayer(master1)
+        g2 = self.font[glyphName].getLayer(master2)
+
+        structure1, components1, coords1 = readGlyphStructure(g1)
+        structure2, components2, coords2 = readGlyphStructure(g2)
+        checkCompatibility(glyphName, {master1: (structure1, components1), master2: (structure2, components2)})
+
+        start = len(self.base)
+        self.base.extend(coords1)
+        self.delta.extend(b - a for a, b in zip(coords1, coords2))
+        self.glyphs[glyphName] = start, len(self.base), structure1, components1, g1.unicode
+        self.loadBaseGlyphs(components1)
+
+    def getComponents(self, glyphName):
+        return self.glyphs[glyphName][3]
+
+    def loadFont(self):
+        '''
+        Load all glyphs which are present in both master layers.
+
+        '''
+        master1, master2 = self.masters
+        glyphNames = set(self.font.getLayer(master1).keys()) & set(self.font.getLayer(master2).keys())
+        self.loadGlyphs(sorted(glyphNames))
+
+    def interpolateCoordinates(self, factor, ranges=None):
+        '''
+        Calculate coordinates for a given interpolation factor in one pass over the arrays:
+        the given `(start, end)` slices one after the other, or all loaded glyphs by default.
+
+        '''
+        if ranges is None:
+            base, delta = self.base, self.delta
+        else:
+            base = array('d')
+            delta = array('d')
+            for start, end in ranges:
+                base.extend(self.base[start:end])
+                delta.extend(self.delta[start:end])
+        if not base:
+            return array('d')
+
+        if numpy is not None:
+            values = numpy.frombuffer(base) + numpy.frombuffer(delta) * factor
+            if self.round:
+                # same as `otRound`
+                values = numpy.floor(values + 0.5)
+            return array('d', values.tobytes())
+
+        # `map` keeps the loop over the coordinates in C
+        values = map(add, base, map(mul, delta, repeat(factor)))
+        if self.round:
+            values = map(floor, map(add, values, repeat(0.5)))
+        return array('d', values)
+
+    def makeGlyphs(self, glyphNames, factor):
+        '''
+        Interpolate loaded glyphs at a given factor, without linking their components.
+
+        '''
+        glyphNames = list(glyphNames)
+        ranges = [self.glyphs[glyphName][:2] for glyphName in glyphNames]
+        coords = self.interpolateCoordinates(factor, ranges)
+        glyphs = {}
+        i = 0
+        for glyphName, (start, end) in zip(glyphNames, ranges):
+            structure, components, unicode = self.glyphs[glyphName][2:]
+            glyphs[glyphName] = makeInstanceGlyph(glyphName, unicode, structure, components, coords, i)
+            i += end - start
+        return glyphs
+
+    def instances(self, glyphNames, factor):
+        '''
+        Interpolate the given glyphs at a given factor.
+        Returns a dict of `InstanceGlyph` objects by glyph name.
+
+        '''
+        self.loadGlyphs(glyphNames)
+        glyphs = self.makeGlyphs(self.getBaseGlyphs(glyphNames), factor)
+        linkComponents(glyphs)
+        return {glyphName: glyphs[glyphName] for glyphName in set(glyphNames)}
+
+    def instancesForFactors(self, glyphNames, factors):
+        '''
+        Interpolate the given glyphs at several factors.
+        Returns a list with one dict of `InstanceGlyph` objects per factor.
+
+        '''
+        return [self.instances(glyphNames, factor) for factor in factors]
+
+
+class MultiMasterInstancer(BaseInterpolator):
+
+    '''
+    Interpolate glyphs between any number of master layers of a font.
+
+    Masters are given as a dict of layer names and normalized designspace locations,
+    for example `{'regular': {}, 'bold': {'weight': 1}, 'wide': {'width': 1}}`.
+    One master must be at the default location `{}`.
+
+    Deltas between the masters are calculated once per glyph with a `fontTools` variation model.
+    Instances at any number of locations are then made in one batch from the precomputed deltas.
+    Glyphs which are missing from some layers are interpolated between the masters that contain them.
+
+    '''
+
+    def __init__(self, font, masters, round=True):
+        self.font = font
+        self.masters = {layerName: dict(location) for layerName, location in masters.items()}
+        self.axes = []
+        for location in self.masters.values():
+            for axis in location:
+                if axis not in self.axes:
+                    self.axes.append(axis)
+        self.round = round
+        self.clear()
+
+    def clear(self):
+        super().clear()
+        self._models = {}
+
+    def getModel(self, layerNames):
+        if layerNames not in self._models:
+            locations = [self.masters[layerName] for layerName in layerNames]
+            self._models[layerNames] = VariationModel(locations, axisOrder=self.axes)
+        return self._models[layerNames]
+
+    def loadGlyph(self, glyphName):
+        if glyphName in self.glyphs:
+            return
+
+        layerNames = []
+        structures = {}
+        masterValues = []
+        for layerName in self.masters:
+            layer = self.font.getLayer(layerName)
+            if glyphName not in layer:
+                continue
+            glyph = layer[glyphName]
+            structure, components, coords = readGlyphStructure(glyph)
+            structures[layerName] = structure, components
+            masterValues.append(Vector(coords))
+            layerNames.append(layerName)
+            if len(layerNames) == 1:
+                unicode = glyph.unicode
+
+        if not any(not self.masters[layerName] for layerName in layerNames):
+            raise ValueError(f"Glyph '{glyphName}' is missing from the default master.")
+        checkCompatibility(glyphName, structures)
+
+        model = self.getModel(tuple(layerNames))
+        deltas = model.getDeltas(masterValues)
+        structure, components = structures[layerNames[0]]
+        self.glyphs[glyphName] = structure, components, unicode, model, deltas
+        self.loadBaseGlyphs(components)
+
+    def getComponents(self, glyphName):
+        return self.glyphs[glyphName][1]
+
+    def normalizeLocation(self, location):
+        '''
+        Locations can be given as dicts or, for the first axis, as plain numbers.
+
+        '''
+        if isinstance(location, dict):
+            return location
+        return {self.axes[0]: location}
+
+    def instances(self, glyphNames, locations):
+        '''
+        Interpolate the given glyphs at several locations.
+        Returns a list with one dict of `InstanceGlyph` objects per location.
+
+        '''
+        self.loadGlyphs(glyphNames)
+        locations = [self.normalizeLocation(location) for location in locations]
+        requested = set(glyphNames)
+        glyphNames = self.getBaseGlyphs(requested)
+
+        # scalars depend only on the model, so calculate them once per model and location
+        scalars = {}
+        for model in set(self.glyphs[glyphName][3] for glyphName in glyphNames):
+            scalars[id(model)] = [model.getScalars(location) for location in locations]
+
+        results = [{} for location in locations]
+        for glyphName in glyphNames:
+            structure, components, unicode, model, deltas = self.glyphs[glyphName]
+            for i, locationScalars in enumerate(scalars[id(model)]):
+                coords = model.interpolateFromDeltasAndScalars(deltas, locationScalars)
+                if self.round:
+                    coords = [otRound(v) for v in coords]
+                results[i][glyphName] = makeInstanceGlyph(glyphName, unicode, structure, components, coords)
+        for glyphs in results:
+            linkComponents(glyphs)
+        return [{glyphName: glyphs[glyphName] for glyphName in requested} for glyphs in results]
+
+
+#---------
+# testing
+#---------
+
+if __name__ == '__main__':
+
+    from fontParts.world import NewFont, RGlyph
+
+    # a composite glyph interpolates like in fontParts
+    font = NewFont()
+    font.newLayer('bold')
+    for layerName, (x, shift) in {'public.default': (100, 50), 'bold': (200, 80)}.items():
+        layer = font.getLayer(layerName)
+        base = layer.newGlyph('a')
+        base.width = 500
+        pen = base.getPen()
+        pen.moveTo((0, 0))
+        pen.lineTo((x, 0))
+        pen.lineTo((x, 400))
+        pen.closePath()
+        composite = layer.newGlyph('aacute')
+        composite.width = 500
+        composite.appendComponent('a', offset=(shift, 0))
+
+    engine = InterpolationEngine(font, ('public.default', 'bold'))
+    for factor in [0, 0.25, 0.5, 1]:
+        instance = engine.instances(['aacute'], factor)['aacute']
+        expected = RGlyph()
+        expected.interpolate(factor, font['aacute'], font.getLayer('bold')['aacute'])
+        assert [c.baseGlyph for c in instance.components] == [c.baseGlyph for c in expected.components]
+        assert [tuple(c.transformation) for c in instance.components] == [tuple(c.transformation) for c in expected.components]
+        assert instance.width == expected.width
+        recording = RecordingPen()
+        instance.draw(recording)
+        assert recording.value, 'composite glyph has no outline'
+
+        instancer = MultiMasterInstancer(font, {'public.default': {}, 'bold': {'weight': 1}})
+        instance = instancer.instances(['aacute'], [factor])[0]['aacute']
+        assert [tuple(c.transformation) for c in instance.components] == [tuple(c.transformation) for c in expected.components]
+        assert instance.width == expected.width
+        recording = RecordingPen()
+        instance.draw(recording)
+        assert recording.value, 'composite glyph has no outline'
+
+    # masters with different components are not compatible
+    font.getLayer('bold')['aacute'].appendComponent('a')
+    try:
+        InterpolationEngine(font, ('public.default', 'bold')).instances(['aacute'], 0.5)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('incompatible components were not detected')
+    print('ok')
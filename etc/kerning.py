@@ -0,0 +1,129 @@
+'''
+Kerning lookups with group resolution, and a kerning matrix for visualization.
+
+'''
+
+class KerningIndex:
+
+    '''
+    An index for fast kerning lookups of glyph pairs.
+
+    Kerning groups are resolved with reverse maps from glyph names to
+    `public.kern1` and `public.kern2` groups, which are built once.
+    Lookups follow the UFO precedence rules for kerning exceptions:
+    glyph + glyph, glyph + group, group + glyph, group + group.
+
+    '''
+
+    def __init__(self, kerning, groups):
+        self.pairs = dict(kerning.items())
+        self.side1Groups = {}
+        self.side2Groups = {}
+        for groupName, glyphNames in groups.items():
+            if groupName.startswith('public.kern1.'):
+                side = self.side1Groups
+            elif groupName.startswith('public.kern2.'):
+                side = self.side2Groups
+            else:
+                continue
+            for glyphName in glyphNames:
+                side[glyphName] = groupName
+
+    @classmethod
+    def fromFont(cls, font):
+        return cls(font.kerning, font.groups)
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def get(self, glyphName1, glyphName2, default=0):
+        '''
+        Get the kerning value for a pair of glyphs.
+
+        '''
+        pairs = self.pairs
+        if (glyphName1, glyphName2) in pairs:
+            return pairs[glyphName1, glyphName2]
+
+        group1 = self.side1Groups.get(glyphName1)
+        group2 = self.side2Groups.get(glyphName2)
+
+        if group2 is not None and (glyphName1, group2) in pairs:
+            return pairs[glyphName1, group2]
+        if group1 is not None and (group1, glyphName2) in pairs:
+            return pairs[group1, glyphName2]
+        if group1 is not None and group2 is not None and (group1, group2) in pairs:
+            return pairs[group1, group2]
+
+        return default
+
+    def __getitem__(self, pair):
+        return self.get(*pair)
+
+    def getKerningForText(self, glyphNames):
+        '''
+        Get the kerning values between each glyph and the next one.
+        The last value is always zero.
+
+        '''
+        values = [self.get(glyphName1, glyphName2) for glyphName1, glyphName2 in zip(glyphNames, glyphNames[1:])]
+        if glyphNames:
+            values.append(0)
+        return values
+
+
+class KerningMatrix:
+
+    '''
+    A sparse matrix of kerning values between first-side and second-side kerning classes.
+
+    Rows and columns are the kerning groups and single glyphs which appear in the kerning,
+    so exceptions get a row or column of their own. The matrix is built in one pass over the pairs,
+    and only non-zero cells are stored, as `(row, column, value)`.
+
+    '''
+
+    def __init__(self, kerning):
+        pairs = dict(kerning.items())
+        self.firsts = sorted(set(first for first, second in pairs))
+        self.seconds = sorted(set(second for first, second in pairs))
+        rows = {first: i for i, first in enumerate(self.firsts)}
+        cols = {second: j for j, second in enumerate(self.seconds)}
+
+        self.cells = []
+        for (first, second), value in pairs.items():
+            if not value:
+                continue
+            self.cells.append((rows[first], cols[second], value))
+
+    @classmethod
+    def fromFont(cls, font):
+        return cls(font.kerning)
+
+    @property
+    def shape(self):
+        return len(self.firsts), len(self.seconds)
+
+    @property
+    def maxValue(self):
+        '''
+        The largest absolute kerning value.
+
+        '''
+        return max([abs(value) for i, j, value in self.cells] or [0])
+
+    def cellsByValue(self, steps):
+        '''
+        Group all non-zero cells into buckets of similar values.
+
+        Returns a dict of `(sign, level)` keys and lists of `(row, column)` cells,
+        where `level` goes from 1 to `steps` and is proportional to the absolute value.
+
+        '''
+        maxValue = self.maxValue
+        buckets = {}
+        for i, j, value in self.cells:
+            level = max(1, int(round(abs(value) / maxValue * steps)))
+            key = 1 if value > 0 else -1, level
+            buckets.setdefault(key, []).append((i, j))
+        return buckets
@@ -1,15 +1,12 @@
 from importlib import reload
-import logotype
-reload(logotype)
 import fontPartsMap
 reload(fontPartsMap)
+import pages
+reload(pages)
 
 import os
-from fontTools.agl import UV2AGL
-from fontParts.world import OpenFont
 
-from fontPartsMap import FontPartsMap
-from logotype import FontPartsLogoType
+from pages import makePageJobs, renderPages, mergePages
 
 folder = os.getcwd()
 ufoPath = os.path.join(folder, 'FontParts.ufo')
@@ -59,57 +56,23 @@ mapAttrs = {
     'dimColor'           : (0.8,),
 }
 
-f = OpenFont(ufoPath)
-L = FontPartsLogoType(f)
-L.setAttributes(typeAttrs)
+# layers shown one by one, one page each
+steps = ['font', 'info', 'layer', 'glyph', 'anchor', 'guideline', 'contour', 'point', 'bPoint', 'segment']
 
-M = FontPartsMap()
-M.setAttributes(mapAttrs)
-
-def drawPage(L, M, index=True):
-    frameDuration(2)
-    fill(1)
-    rect(0, 0, width(), height())
-
-    translate(50, 100)
-    L.draw((0, 0))
-
-    translate(100, 352)
-    with savedState():
-        scale(0.4)
-        M.draw((0, 0))
-    
-    if index:
-        objectNames = L.layers.keys()
-        T = FormattedString(font='Menlo-Bold', fontSize=10, lineHeight=14)
-        for obj in objectNames:
-            c = L.colorScheme.colorsRGB[obj] if not obj in M.dimObjects else M.dimColor
-            txt = f'{obj}\n' # if obj in M.tree.keys() else f'\t{obj}\n' 
-            T.append(txt, fill=c)
-        text(T, (300, 80))
-
-# ----------    
+# ----------
 # make pages
 # ----------
-    
-index = True
-    
-for step in ['font', 'info', 'layer', 'glyph', 'anchor', 'guideline', 'contour', 'point', 'bPoint', 'segment']:
-    newPage('A4Landscape')
-    for layer in L.layers:
-        L.layers[layer] = True if layer == step else False
-    M.dimObjects = [k for k, v in typeAttrs['layers'].items() if not v]
-    drawPage(L, M, index)
 
-newPage('A4Landscape')
-for layer in L.layers:
-    L.layers[layer] = True
-    M.dimObjects = []
-L.layers['layer'] = False
-L.layers['contour'] = False
-drawPage(L, M, index)
+if __name__ == '__main__':
 
-folder = os.getcwd()
-pdfPath = os.path.join(folder, 'FontParts.gif')
-print(pdfPath)
-saveImage(pdfPath)
+    index = True
+    jobs = makePageJobs(list(typeAttrs['layers'].keys()), steps, index)
+
+    # render pages in parallel, then merge them in order
+    # the output is a GIF, so maps can be placed as pre-rendered images
+    pagesFolder = os.path.join(folder, 'pages')
+    pagePaths = renderPages(jobs, ufoPath, typeAttrs, mapAttrs, pagesFolder, thumbnails=True)
+
+    pdfPath = os.path.join(folder, 'FontParts.gif')
+    print(pdfPath)
+    mergePages(pagePaths, pdfPath)
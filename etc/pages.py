@@ -0,0 +1,149 @@
+'''
+Page jobs for the FontParts objects document.
+
+Each page is described by its logotype layers and the map objects to dim,
+so pages can be rendered independently in separate processes and merged afterwards.
+
+'''
+
+import os
+import multiprocessing
+import drawBot
+from fontPartsMap import FontPartsMap
+from type import FontPartsLogoType
+
+
+class PageJob:
+
+    def __init__(self, index, layers, dimObjects, drawIndex=True):
+        self.index = index
+        self.layers = layers
+        self.dimObjects = dimObjects
+        self.drawIndex = drawIndex
+
+    def getPath(self, folder):
+        return os.path.join(folder, 'page_%03d.pdf' % self.index)
+
+
+def makePageJobs(layerNames, steps, drawIndex=True):
+    '''
+    Make one page for each step showing only that layer,
+    and a last page showing all layers.
+
+    '''
+    jobs = []
+    for step in steps:
+        layers = {layer: layer == step for layer in layerNames}
+        dimObjects = [layer for layer in layerNames if layer != step]
+        jobs.append(PageJob(len(jobs), layers, dimObjects, drawIndex))
+
+    layers = {layer: True for layer in layerNames}
+    layers['layer'] = False
+    layers['contour'] = False
+    jobs.append(PageJob(len(jobs), layers, [], drawIndex))
+
+    return jobs
+
+
+def drawPage(L, M, job, thumbnails=False):
+    '''
+    Draw the logotype and the map for a page job on a new page.
+
+    With `thumbnails`, the map is placed as an image which is rendered once per dimmed state.
+
+    '''
+    L.layers = dict(job.layers)
+    M.dimObjects = job.dimObjects
+
+    drawBot.newPage('A4Landscape')
+    drawBot.frameDuration(2)
+    drawBot.fill(1)
+    drawBot.rect(0, 0, drawBot.width(), drawBot.height())
+
+    drawBot.translate(50, 100)
+    L.draw((0, 0))
+
+    drawBot.translate(100, 352)
+    if thumbnails:
+        M.drawThumbnail((0, 0), 0.4)
+    else:
+        with drawBot.savedState():
+            drawBot.scale(0.4)
+            M.draw((0, 0))
+
+    if job.drawIndex:
+        objectNames = L.layers.keys()
+        T = drawBot.FormattedString(font='Menlo-Bold', fontSize=10, lineHeight=14)
+        for obj in objectNames:
+            c = L.colorScheme.colorsRGB[obj] if not obj in M.dimObjects else M.getColor(obj)
+            txt = f'{obj}\n'
+            T.append(txt, fill=c)
+        drawBot.text(T, (300, 80))
+
+# -------
+# workers
+# -------
+
+_worker = {}
+
+def initWorker(ufoPath, typeAttrs, mapAttrs, folder, thumbnails=False):
+    '''
+    Load the font and set up the logotype and map once per worker process.
+    The font is read from the compiled geometry cache, which is updated if the UFO has changed.
+
+    '''
+    L = FontPartsLogoType.fromPath(ufoPath, useCache=True)
+    L.setAttributes(typeAttrs)
+    M = FontPartsMap()
+    M.setAttributes(mapAttrs)
+    _worker.update(L=L, M=M, folder=folder, thumbnails=thumbnails)
+
+def getWorkerLogoType():
+    '''
+    Get the logotype set up by `initWorker` in this process.
+
+    '''
+    return _worker['L']
+
+def renderPageJob(job):
+    path = job.getPath(_worker['folder'])
+    drawBot.newDrawing()
+    drawPage(_worker['L'], _worker['M'], job, _worker['thumbnails'])
+    drawBot.saveImage(path)
+    drawBot.endDrawing()
+    return path
+
+def renderPages(jobs, ufoPath, typeAttrs, mapAttrs, folder, processes=None, thumbnails=False):
+    '''
+    Render each page job to a separate PDF file in the given folder.
+    Returns the page paths in the same order as the jobs.
+
+    Pages are rendered in a pool of worker processes (one per CPU by default).
+    With `processes=1` all pages are rendered in the current process.
+    With `thumbnails`, maps are placed as pre-rendered images (see `drawPage`).
+
+    '''
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    initArgs = ufoPath, typeAttrs, mapAttrs, folder, thumbnails
+
+    if processes == 1:
+        initWorker(*initArgs)
+        return [renderPageJob(job) for job in jobs]
+
+    with multiprocessing.Pool(processes, initializer=initWorker, initargs=initArgs) as pool:
+        return pool.map(renderPageJob, jobs)
+
+def mergePages(pagePaths, outputPath, frameDuration=2):
+    '''
+    Merge rendered pages into one multi-page document (PDF, GIF, etc.).
+
+    '''
+    drawBot.newDrawing()
+    for pagePath in pagePaths:
+        w, h = drawBot.imageSize(pagePath)
+        drawBot.newPage(w, h)
+        drawBot.frameDuration(frameDuration)
+        drawBot.image(pagePath, (0, 0))
+    drawBot.saveImage(outputPath)
+    drawBot.endDrawing()
@@ -1,13 +1,18 @@
 import os
-import drawBot
+from collections import OrderedDict
 from fontPartsMap import FontPartsColorScheme
 from fontTools.agl import UV2AGL
-from fontParts.world import OpenFont, RGlyph
+from fontParts.world import OpenFont
+from interpolation import InterpolationEngine, MultiMasterInstancer
+from kerning import KerningIndex, KerningMatrix
+from fontLoader import openFontSubset, readLayers
+from profiling import nullProfiler
+from renderBackend import drawBotBackend, drawSymbol
 
 
 def getKerningForPair(font, glyphName1, glyphName2):
-    for kPair in font.kerning.keys():
-        print(glyphName, kPair, glyphName==kPair[0])
+    # for repeated lookups, build a KerningIndex once and use that instead
+    return KerningIndex.fromFont(font).get(glyphName1, glyphName2)
 
 def countContoursPoints(f):
     nContours = 0
@@ -19,6 +24,28 @@ def countContoursPoints(f):
                 nPoints += 1
     return nContours, nPoints
 
+class FontPartsLayout:
+    '''
+    Horizontal layout of a line of interpolated glyphs.
+
+    '''
+    def __init__(self, glyphNames, widths, kerning=None):
+        self.glyphNames = glyphNames
+        self.widths = widths
+        self.kerning = kerning if kerning is not None else [0] * len(widths)
+        self.offsets = []
+        x = 0
+        for w, k in zip(widths, self.kerning):
+            self.offsets.append(x)
+            x += w + k
+        self.length = x
+
+    def __len__(self):
+        return len(self.glyphNames)
+
+    def __iter__(self):
+        return iter(zip(self.glyphNames, self.offsets, self.widths))
+
 class FontPartsLogoType:
 
     colorScheme = FontPartsColorScheme()
@@ -53,6 +80,30 @@ class FontPartsLogoType:
 
     interpolationFactor = 0.5
 
+    # master layers used for interpolation
+    masters = 'regular', 'bold'
+
+    # maximum number of interpolated glyphs kept in the cache
+    cacheSize = 256
+
+    # master layers and their normalized locations for multi-master instances
+    designspace = {
+        'regular' : {},
+        'bold'    : {'weight': 1},
+    }
+
+    # instances drawn in the layer layer
+    # if no locations are given, steps are spread evenly along the first axis
+    layerSteps = 3
+    layerLocations = None
+
+    # apply kerning between glyphs
+    applyKerning = False
+
+    # kerning heatmap: height in font units, number of color levels
+    kerningHeatmapHeight = 1000
+    kerningHeatmapSteps = 5
+
     bPointSize = pointSize * 2
 
     anchorSize = pointSize * 2
@@ -76,31 +127,304 @@ class FontPartsLogoType:
 
     segmentStrokeWidth = 20
 
+    # layers in drawing order, and the methods which draw them
+    layerMethods = [
+        ('font',      'drawFont'),
+        ('layer',     'drawLayer'),
+        ('info',      'drawInfo'),
+        ('guideline', 'drawGuideline'),
+        ('glyph',     'drawGlyph'),
+        ('font lib',  'drawFontLib'),
+        ('kerning',   'drawKerning'),
+        ('features',  'drawFeatures'),
+        ('glyph lib', 'drawGlyphLib'),
+        ('anchor',    'drawAnchor'),
+        ('component', 'drawComponent'),
+        ('image',     'drawImage'),
+        ('contour',   'drawContour'),
+        ('point',     'drawPoint'),
+        ('bPoint',    'drawBPoint'),
+        ('segment',   'drawSegment'),
+    ]
+
+    # font data used by each layer: glyphs in `txt`, font info, kerning and groups
+    layerSources = {
+        'font'      : ['glyphs', 'fontinfo'],
+        'glyph'     : ['glyphs', 'fontinfo'],
+        'font lib'  : [],
+        'info'      : ['glyphs', 'fontinfo'],
+        'kerning'   : ['glyphs', 'fontinfo', 'kerning', 'groups'],
+        'features'  : [],
+        'glyph lib' : [],
+        'anchor'    : ['glyphs'],
+        'component' : ['glyphs'],
+        'image'     : [],
+        'guideline' : ['glyphs', 'fontinfo'],
+        'contour'   : ['glyphs'],
+        'point'     : ['glyphs'],
+        'bPoint'    : ['glyphs'],
+        'segment'   : ['glyphs'],
+        'layer'     : ['glyphs'],
+    }
+
+    # set to a `profiling.Profiler` to record timings of each layer
+    profiler = nullProfiler
+
+    # backend which draws the logotype, see `renderBackend`
+    backend = drawBotBackend
+
     def __init__(self, font):
+        self._cache = OrderedDict()
+        self._layout = None
+        self._layoutKey = None
+        self._engine = None
+        self._instancer = None
+        self._kerning = None
+        self._kerningMatrix = None
+        self._layerGlyphs = None
+        self._layerGlyphsKey = None
+        self.fontRevision = 0
         self.font = font
+        # set by `fromPath` in lazy mode, to read more layers when the masters change
+        self.ufoPath = None
+        self.useCache = False
+
+    @classmethod
+    def fromPath(cls, ufoPath, txt=None, lazy=True, useCache=False):
+        '''
+        Make a logotype from a UFO path.
+
+        In lazy mode, only the glyphs needed to set `txt` are read,
+        and only from the master layers used for interpolation.
+        Other layers are read when `masters` or `designspace` are changed to use them.
+        The text can't be changed to include other glyphs afterwards.
+        With `useCache`, lazy mode reads from a compiled geometry cache next to the UFO.
+
+        '''
+        txt = txt if txt is not None else cls.txt
+        if lazy:
+            layerNames = set(cls.masters) | set(cls.designspace.keys())
+            font = openFontSubset(ufoPath, text=txt, layerNames=layerNames, useCache=useCache)
+        else:
+            font = OpenFont(ufoPath)
+        logo = cls(font)
+        logo.txt = txt
+        if lazy:
+            logo.ufoPath = ufoPath
+            logo.useCache = useCache
+        return logo
 
     def setAttributes(self, attrsDict):
         for key, value in attrsDict.items():
             setattr(self, key, value)
 
     @property
-    def textLength(self):
-        w = 0
-        for char in self.txt:
-            uni = ord(char)
-            glyphName = UV2AGL.get(uni)
+    def font(self):
+        return self._font
+
+    @font.setter
+    def font(self, font):
+        self._font = font
+        self.clearCache()
+
+    def clearCache(self):
+        '''
+        Remove all interpolated glyphs from the cache.
+        Call this after making changes to the font.
+
+        '''
+        self._cache.clear()
+        self._layout = None
+        self._engine = None
+        self._instancer = None
+        self._kerning = None
+        self._kerningMatrix = None
+        self._layerGlyphs = None
+        self.fontRevision += 1
+
+    def invalidateGlyphs(self, glyphNames):
+        '''
+        Remove some glyphs from the cache after they have been changed in the font.
+        Cached composite glyphs which use them as components are removed too. Other interpolated glyphs are kept.
+
+        '''
+        glyphNames = set(glyphNames)
+        # cached composites are drawn with the instances of their base glyphs
+        def usesGlyphs(glyph):
+            for component in glyph.components:
+                if component.baseGlyph in glyphNames:
+                    return True
+                if component.baseInstance is not None and usesGlyphs(component.baseInstance):
+                    return True
+            return False
+
+        for key in [key for key, glyph in self._cache.items() if key[0] in glyphNames or usesGlyphs(glyph)]:
+            del self._cache[key]
+        if self._engine is not None:
+            self._engine.removeGlyphs(glyphNames)
+        if self._instancer is not None:
+            self._instancer.removeGlyphs(glyphNames)
+        self._layout = None
+        self._layerGlyphs = None
+
+    def invalidateKerning(self):
+        '''
+        Forget the kerning index and matrix after the kerning or groups have been changed in the font.
+
+        '''
+        self._kerning = None
+        self._kerningMatrix = None
+        self._layout = None
+
+    def getSources(self, layers=None):
+        '''
+        Get the font data used to draw the given layers (the enabled layers by default).
+
+        '''
+        if layers is None:
+            layers = self.layers
+        sources = set()
+        for layer, enabled in layers.items():
+            if enabled:
+                sources.update(self.layerSources.get(layer, []))
+        if self.applyKerning and 'glyphs' in sources:
+            sources.update(['kerning', 'groups'])
+        return sources
+
+    def getUsedGlyphs(self, layers=None):
+        '''
+        Get the glyphs drawn by the given layers (the enabled layers by default), as `(font layer, glyph name)` pairs.
+
+        These are the glyphs in `txt` and the base glyphs of their components, in the master layers,
+        and also in the designspace layers if the 'layer' layer is drawn.
+
+        '''
+        if layers is None:
+            layers = self.layers
+        enabled = [layer for layer, on in layers.items() if on and 'glyphs' in self.layerSources.get(layer, [])]
+        if not enabled:
+            return set()
+        fontLayers = set(self.masters)
+        if 'layer' in enabled:
+            fontLayers.update(self.designspace.keys())
+
+        used = set()
+        for layerName in fontLayers:
+            if layerName not in self.font.layerOrder:
+                continue
+            layer = self.font.getLayer(layerName)
+            glyphNames = set()
+            # glyphs missing from the layer are included too, they may have been deleted
+            queue = [glyphName for glyphName in self.glyphNames if glyphName is not None]
+            while queue:
+                glyphName = queue.pop()
+                if glyphName in glyphNames:
+                    continue
+                glyphNames.add(glyphName)
+                if glyphName in layer:
+                    queue.extend(component.baseGlyph for component in layer[glyphName].components)
+            used.update((layerName, glyphName) for glyphName in glyphNames)
+        return used
+
+    def loadLayers(self, layerNames):
+        '''
+        Read layers which are missing from a font loaded lazily with `fromPath`.
+
+        '''
+        if self.ufoPath is None:
+            return
+        missing = [layerName for layerName in layerNames if layerName not in self.font.layerOrder]
+        if missing:
+            readLayers(self.font, self.ufoPath, missing, self.useCache)
+
+    @property
+    def engine(self):
+        if self._engine is None or self._engine.masters != tuple(self.masters):
+            self.loadLayers(self.masters)
+            self._engine = InterpolationEngine(self.font, self.masters)
+        return self._engine
+
+    @property
+    def instancer(self):
+        if self._instancer is None or self._instancer.masters != self.designspace:
+            self.loadLayers(self.designspace.keys())
+            self._instancer = MultiMasterInstancer(self.font, self.designspace)
+        return self._instancer
+
+    @property
+    def kerning(self):
+        if self._kerning is None:
+            self._kerning = KerningIndex.fromFont(self.font)
+        return self._kerning
+
+    @property
+    def kerningMatrix(self):
+        if self._kerningMatrix is None:
+            self._kerningMatrix = KerningMatrix.fromFont(self.font)
+        return self._kerningMatrix
+
+    @property
+    def glyphNames(self):
+        return [UV2AGL.get(ord(char)) for char in self.txt]
+
+    def getGlyph(self, glyphName, factor=None):
+        '''
+        Get an interpolated glyph between the two master layers.
+        Glyphs are interpolated only once and kept in a LRU cache.
+
+        '''
+        return self.getGlyphs([glyphName], factor)[glyphName]
+
+    def getGlyphs(self, glyphNames, factor=None):
+        '''
+        Get interpolated glyphs for a list of glyph names.
+        All glyphs missing from the cache are interpolated in one batch.
+
+        '''
+        if factor is None:
+            factor = self.interpolationFactor
+        master1, master2 = self.masters
+
+        glyphs = {}
+        missing = []
+        for glyphName in glyphNames:
+            key = glyphName, master1, master2, factor
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                glyphs[glyphName] = self._cache[key]
+            else:
+                missing.append(glyphName)
 
-            # interpolate
-            g1 = self.font[glyphName].getLayer('regular')
-            g2 = self.font[glyphName].getLayer('bold')
-            glyph = RGlyph()
-            glyph.name = g1.name
-            glyph.unicode = g1.unicode
-            glyph.interpolate(self.interpolationFactor, g1, g2)
+        if missing:
+            self.profiler.count('interpolations', len(set(missing)))
+            for glyphName, glyph in self.engine.instances(missing, factor).items():
+                self._cache[glyphName, master1, master2, factor] = glyph
+                glyphs[glyphName] = glyph
+            while len(self._cache) > self.cacheSize:
+                self._cache.popitem(last=False)
 
-            w += glyph.width
+        return glyphs
 
-        return w
+    @property
+    def layout(self):
+        '''
+        Advance widths and x offsets of all glyphs in `txt`.
+        The layout is calculated once for each text, interpolation factor and font revision.
+
+        '''
+        key = self.txt, self.interpolationFactor, tuple(self.masters), self.applyKerning, self.fontRevision
+        if self._layout is None or key != self._layoutKey:
+            glyphNames = self.glyphNames
+            glyphs = self.getGlyphs(glyphNames)
+            widths = [glyphs[glyphName].width for glyphName in glyphNames]
+            kerning = self.kerning.getKerningForText(glyphNames) if self.applyKerning else None
+            self._layout = FontPartsLayout(glyphNames, widths, kerning)
+            self._layoutKey = key
+        return self._layout
+
+    @property
+    def textLength(self):
+        return self.layout.length
 
     @property
     def lineGap(self):
@@ -118,9 +442,9 @@ class FontPartsLogoType:
 
     def drawFont(self):
         color = self.colorScheme.colorsRGB['font']
-        drawBot.save()
-        drawBot.fill(*color)
-        drawBot.fontSize(self.captionSizeLarge)
+        self.backend.save()
+        self.backend.fill(*color)
+        self.backend.fontSize(self.captionSizeLarge)
         h = self.captionSizeLarge * 2
         m = 20
         y = self.yBottom - h - 20
@@ -128,91 +452,87 @@ class FontPartsLogoType:
         # txt += f' ({len(self.font.layerOrder)} layers)' 
         # txt += f' ({len(self.font)} glyphs)' 
         # txt += '%s contours / %s points ' % countContoursPoints(self.font)
-        drawBot.textBox(txt, (0, y, self.textLength, h), align='center')
-        drawBot.restore()
+        self.backend.textBox(txt, (0, y, self.textLength, h), align='center')
+        self.backend.restore()
 
     def drawGlyph(self):
         color = self.colorScheme.colorsRGB['glyph']
-        drawBot.save()
-        drawBot.fontSize(self.captionSize)
-        drawBot.font(self.captionFont)
-        for char in self.txt:
-            uni = ord(char)
-            glyphName = UV2AGL.get(uni)
-
-            # interpolate
-            g1 = self.font[glyphName].getLayer('regular')
-            g2 = self.font[glyphName].getLayer('bold')
-            glyph = RGlyph()
-            glyph.name = g1.name
-            glyph.unicode = g1.unicode
-            glyph.interpolate(self.interpolationFactor, g1, g2)
+        self.backend.save()
+        self.backend.fontSize(self.captionSize)
+        self.backend.font(self.captionFont)
+        layout = self.layout
+        for glyphName, kern in zip(layout.glyphNames, layout.kerning):
+            glyph = self.getGlyph(glyphName)
 
             # contours
-            drawBot.fill(*color)
-            B = drawBot.BezierPath()
-            for contour in glyph.contours:
-                contour.draw(B)
-            drawBot.drawPath(B)
+            self.backend.fill(*color)
+
+            def drawOutline():
+                B = self.backend.BezierPath()
+                glyph.draw(B)
+                self.backend.drawPath(B)
+
+            # outlines of repeated glyphs are reused in vector output
+            drawSymbol(self.backend, ('glyph', color, glyph.outlineKey), drawOutline)
 
             # advance width
             if self.glyphWidthDraw:
-                drawBot.save()
-                drawBot.strokeWidth(self.glyphWidthStrokeWidth)
-                drawBot.stroke(*color)
-                drawBot.line((0, self.yBottom), (0, self.yTop))
-                drawBot.restore()
+                self.backend.save()
+                self.backend.strokeWidth(self.glyphWidthStrokeWidth)
+                self.backend.stroke(*color)
+                self.backend.line((0, self.yBottom), (0, self.yTop))
+                self.backend.restore()
 
             # glyph data
             if self.glyphDataDraw:
                 h = self.captionSize * 1.5
                 m = 40
                 w = glyph.width - m * 2
-                drawBot.save()
-                drawBot.stroke(None)
-                drawBot.fill(*color)
+                self.backend.save()
+                self.backend.stroke(None)
+                self.backend.fill(*color)
                 y = self.yTop - h
-                drawBot.textBox(glyph.name, (m, y, w, h))
-                drawBot.textBox(str(glyph.unicode), (m, y, w, h), align='right')
+                self.backend.textBox(glyph.name, (m, y, w, h))
+                self.backend.textBox(str(glyph.unicode), (m, y, w, h), align='right')
                 y = self.yBottom
-                drawBot.textBox(str(int(glyph.width)), (m, y, w, h), align='center')
-                drawBot.restore()
+                self.backend.textBox(str(int(glyph.width)), (m, y, w, h), align='center')
+                self.backend.restore()
 
             # done glyph
-            drawBot.translate(glyph.width, 0)
+            self.backend.translate(glyph.width + kern, 0)
 
         # last margin
         if self.glyphWidthDraw:
-            drawBot.strokeWidth(self.glyphWidthStrokeWidth)
-            drawBot.stroke(*color)
-            drawBot.line((0, self.yBottom), (0, self.yTop))
+            self.backend.strokeWidth(self.glyphWidthStrokeWidth)
+            self.backend.stroke(*color)
+            self.backend.line((0, self.yBottom), (0, self.yTop))
 
         # done
-        drawBot.restore()
+        self.backend.restore()
 
     def drawFontLib(self):
         pass
 
     def drawInfo(self):
         color = self.colorScheme.colorsRGB['info']
-        drawBot.save()
+        self.backend.save()
 
         # font info
         if self.infoValuesDraw:
-            drawBot.fill(*color)
-            drawBot.fontSize(self.captionSizeLarge)
+            self.backend.fill(*color)
+            self.backend.fontSize(self.captionSizeLarge)
             h = self.captionSizeLarge * 2
             y = self.yTop
             txt  = '%s %s' % (self.font.info.familyName, self.font.info.styleName)
-            drawBot.textBox(txt, (0, y, self.textLength, h))
+            self.backend.textBox(txt, (0, y, self.textLength, h))
 
         # blue zones
         # for i, y in enumerate(self.font.info.postscriptBlueValues):
         #     if not i % 2:
         #         yNext = self.font.info.postscriptBlueValues[i+1]
         #         h = yNext - y
-        #         drawBot.fill(*color + (0.35,))
-        #         drawBot.rect(0, y, self.textLength, h)
+        #         self.backend.fill(*color + (0.35,))
+        #         self.backend.rect(0, y, self.textLength, h)
 
         # vertical dimensions
         yValues = set([
@@ -222,36 +542,64 @@ class FontPartsLogoType:
             self.font.info.descender,
             self.font.info.ascender,
         ])
-        drawBot.font(self.captionFont)
-        drawBot.fontSize(self.captionSize)
+        textLength = self.textLength
+        self.backend.font(self.captionFont)
+        self.backend.fontSize(self.captionSize)
         for y in yValues:
             # draw guide
-            drawBot.stroke(*color)
-            drawBot.strokeWidth(self.infoStrokeWidth)
+            self.backend.stroke(*color)
+            self.backend.strokeWidth(self.infoStrokeWidth)
             if not self.infoLineDash:
-                drawBot.lineDash(None)
+                self.backend.lineDash(None)
             else:
-                drawBot.lineDash(*self.infoLineDash)
-            drawBot.line((0, y), (self.textLength, y))
+                self.backend.lineDash(*self.infoLineDash)
+            self.backend.line((0, y), (textLength, y))
             # draw y value
             if self.infoValuesDraw:
                 w = 300
                 m = 50
-                drawBot.save()
-                drawBot.stroke(None)
-                drawBot.fill(*color)
-                drawBot.textBox(str(int(y)), (-w-m, y-self.captionSize*0.5, w, self.captionSize*1.2), align='right')
-                drawBot.restore()
+                self.backend.save()
+                self.backend.stroke(None)
+                self.backend.fill(*color)
+                self.backend.textBox(str(int(y)), (-w-m, y-self.captionSize*0.5, w, self.captionSize*1.2), align='right')
+                self.backend.restore()
         # done
-        drawBot.restore()
+        self.backend.restore()
 
     def drawKerning(self):
-        # for i, char in enumerate(self.txt):
-        #     if i < len(self.txt) - 1:
-        #         glyphName = char
-        #         glyphNameNext = charNext = self.txt[i+1]
-        #         print(glyphName, glyphNameNext)
-        pass
+        matrix = self.kerningMatrix
+        rows, cols = matrix.shape
+        if not rows or not cols:
+            return
+
+        colorNegative = self.colorScheme.colorsRGB['kerning']
+        colorPositive = self.colorScheme.colorsRGB['groups']
+        steps = self.kerningHeatmapSteps
+
+        textLength = self.textLength
+        w = textLength / cols
+        h = self.kerningHeatmapHeight / rows
+
+        self.backend.save()
+        self.backend.translate(0, self.yTop + self.captionSizeLarge * 2)
+
+        # heatmap: one path and one fill for each group of similar values
+        self.backend.stroke(None)
+        for (sign, level), cells in matrix.cellsByValue(steps).items():
+            color = colorPositive if sign > 0 else colorNegative
+            B = self.backend.BezierPath()
+            for i, j in cells:
+                B.rect(j * w, (rows - i - 1) * h, w, h)
+            self.backend.fill(*color + (level / steps,))
+            self.backend.drawPath(B)
+
+        # frame
+        self.backend.fill(None)
+        self.backend.stroke(*colorNegative)
+        self.backend.strokeWidth(self.infoStrokeWidth)
+        self.backend.rect(0, 0, textLength, self.kerningHeatmapHeight)
+
+        self.backend.restore()
 
     def drawFeatures(self):
         pass
@@ -263,41 +611,40 @@ class FontPartsLogoType:
     def drawAnchor(self):
         r = self.anchorSize * 0.5
         color = self.colorScheme.colorsRGB['anchor']
-        drawBot.save()
-        drawBot.strokeWidth(self.anchorStrokeWidth)
-        drawBot.stroke(*color)
-        drawBot.fill(None)
-        for char in self.txt:
-            uni = ord(char)
-            glyphName = UV2AGL.get(uni)
+        self.backend.save()
+        self.backend.strokeWidth(self.anchorStrokeWidth)
+        self.backend.stroke(*color)
+        self.backend.fill(None)
+        layout = self.layout
+        for glyphName, kern in zip(layout.glyphNames, layout.kerning):
             glyph = self.font[glyphName]
             if len(glyph.anchors):
                 for anchor in glyph.anchors:
                     x, y = anchor.x, anchor.y
-                    drawBot.oval(x-r, y-r, r*2, r*2)
-                    drawBot.line((x-r, anchor.y), (x+r, anchor.y))
-                    drawBot.line((anchor.x, y-r), (anchor.x, y+r))
-            drawBot.translate(glyph.width, 0)
-        drawBot.restore()
+                    self.backend.oval(x-r, y-r, r*2, r*2)
+                    self.backend.line((x-r, anchor.y), (x+r, anchor.y))
+                    self.backend.line((anchor.x, y-r), (anchor.x, y+r))
+            self.backend.translate(glyph.width + kern, 0)
+        self.backend.restore()
 
     def drawComponent(self):
         color = self.colorScheme.colorsRGB['component']
+        fillColor = self.colorScheme.getTable('RGB', alpha=0.5)['component']
         tempName = '_tmp_'
-        drawBot.save()
-        for char in self.txt:
-            uni = ord(char)
-            glyphName = UV2AGL.get(uni)
+        self.backend.save()
+        layout = self.layout
+        for glyphName, kern in zip(layout.glyphNames, layout.kerning):
             glyph = self.font[glyphName]
-            drawBot.fill(*color + (0.5,))
-            drawBot.stroke(*color)
+            self.backend.fill(*fillColor)
+            self.backend.stroke(*color)
             if len(glyph.components):
-                B = drawBot.BezierPath()
+                B = self.backend.BezierPath()
                 for component in glyph.components:
                     component.draw(B)
-                drawBot.drawPath(B)
+                self.backend.drawPath(B)
             # done glyph
-            drawBot.translate(glyph.width, 0)
-        drawBot.restore()
+            self.backend.translate(glyph.width + kern, 0)
+        self.backend.restore()
 
     def drawImage(self):
         # print('image')
@@ -305,80 +652,71 @@ class FontPartsLogoType:
 
     def drawGuideline(self):
         color = self.colorScheme.colorsRGB['guideline']
-        drawBot.save()
-        drawBot.stroke(*color)
-        drawBot.strokeWidth(self.guidelineStrokeWidth)
-        drawBot.font(self.captionFont)
-        drawBot.fontSize(self.captionSize)
+        self.backend.save()
+        self.backend.stroke(*color)
+        self.backend.strokeWidth(self.guidelineStrokeWidth)
+        self.backend.font(self.captionFont)
+        self.backend.fontSize(self.captionSize)
+        textLength = self.textLength
         for guide in self.font.guidelines:
-            drawBot.line((0, guide.y), (self.textLength, guide.y))
+            self.backend.line((0, guide.y), (textLength, guide.y))
             if self.guidelineValuesDraw:
                 w = 300
                 m = 50
-                drawBot.save()
-                drawBot.stroke(None)
-                drawBot.fill(*color)
-                drawBot.textBox(str(int(guide.y)), (-(w + m), guide.y - self.captionSize * 0.5, w, self.captionSize * 1.2), align='right')
-                drawBot.restore()
-        drawBot.restore()
+                self.backend.save()
+                self.backend.stroke(None)
+                self.backend.fill(*color)
+                self.backend.textBox(str(int(guide.y)), (-(w + m), guide.y - self.captionSize * 0.5, w, self.captionSize * 1.2), align='right')
+                self.backend.restore()
+        self.backend.restore()
 
     def drawContour(self):
 
         color = self.colorScheme.colorsRGB['contour']
 
-        drawBot.save()
-        drawBot.fontSize(self.captionSize)
-        drawBot.font(self.captionFont)
-
-        for char in self.txt:
-            uni = ord(char)
-            glyphName = UV2AGL.get(uni)
+        self.backend.save()
+        self.backend.fontSize(self.captionSize)
+        self.backend.font(self.captionFont)
 
-            # interpolate
-            g1 = self.font[glyphName].getLayer('regular')
-            g2 = self.font[glyphName].getLayer('bold')
-            glyph = RGlyph()
-            glyph.name = g1.name
-            glyph.unicode = g1.unicode
-            glyph.interpolate(self.interpolationFactor, g1, g2)
+        layout = self.layout
+        for glyphName, kern in zip(layout.glyphNames, layout.kerning):
+            glyph = self.getGlyph(glyphName)
 
             # draw contours
-            drawBot.stroke(*color)
-            drawBot.strokeWidth(self.contourStrokeWidth)
-            drawBot.fill(None)
-            B = drawBot.BezierPath()
-            for contour in glyph.contours:
-                contour.draw(B)
-            drawBot.drawPath(B)
+            self.backend.stroke(*color)
+            self.backend.strokeWidth(self.contourStrokeWidth)
+            self.backend.fill(None)
+
+            def drawOutline():
+                B = self.backend.BezierPath()
+                glyph.draw(B)
+                self.backend.drawPath(B)
+
+            drawSymbol(self.backend, ('contour', color, self.contourStrokeWidth, glyph.outlineKey), drawOutline)
 
             # done glyph
-            drawBot.translate(glyph.width, 0)
+            self.backend.translate(glyph.width + kern, 0)
 
-        drawBot.restore()
+        self.backend.restore()
 
     def drawPoint(self):
         r = self.pointSize * 0.5
         color = self.colorScheme.colorsRGB['point']
-        drawBot.save()
-        drawBot.fill(*color)
-        for char in self.txt:
-            uni = ord(char)
-            glyphName = UV2AGL.get(uni)
-
-            # interpolate
-            g1 = self.font[glyphName].getLayer('regular')
-            g2 = self.font[glyphName].getLayer('bold')
-            glyph = RGlyph()
-            glyph.name = g1.name
-            glyph.unicode = g1.unicode
-            glyph.interpolate(self.interpolationFactor, g1, g2)
-
-            for c in glyph.contours:
-                for pt in c.points:
-                    x, y = pt.x, pt.y
-                    drawBot.oval(x-r, y-r, r*2, r*2)
-            drawBot.translate(glyph.width, 0)
-        drawBot.restore()
+        self.backend.save()
+        self.backend.fill(*color)
+        layout = self.layout
+        for glyphName, kern in zip(layout.glyphNames, layout.kerning):
+            glyph = self.getGlyph(glyphName)
+            points = tuple((pt.x, pt.y) for c in glyph.contours for pt in c.points)
+
+            def drawPoints():
+                for x, y in points:
+                    self.backend.oval(x-r, y-r, r*2, r*2)
+
+            # markers of repeated glyphs are reused in vector output
+            drawSymbol(self.backend, ('points', r, color, points), drawPoints)
+            self.backend.translate(glyph.width + kern, 0)
+        self.backend.restore()
 
     def drawBPoint(self):
 
@@ -386,18 +724,10 @@ class FontPartsLogoType:
         r2 = self.pointSize * 0.5
 
         color = self.colorScheme.colorsRGB['bPoint']
-        drawBot.save()
-        for char in self.txt:
-            uni = ord(char)
-            glyphName = UV2AGL.get(uni)
-
-            # interpolate
-            g1 = self.font[glyphName].getLayer('regular')
-            g2 = self.font[glyphName].getLayer('bold')
-            glyph = RGlyph()
-            glyph.name = g1.name
-            glyph.unicode = g1.unicode
-            glyph.interpolate(self.interpolationFactor, g1, g2)
+        self.backend.save()
+        layout = self.layout
+        for glyphName, kern in zip(layout.glyphNames, layout.kerning):
+            glyph = self.getGlyph(glyphName)
 
             for c in glyph.contours:
                 for pt in c.bPoints:
@@ -405,125 +735,123 @@ class FontPartsLogoType:
                     xIn,  yIn  = pt.bcpIn
                     xOut, yOut = pt.bcpOut
 
-                    drawBot.fill(*color)
-                    drawBot.stroke(None)
-                    drawBot.oval(x - r1, y - r1, r1 * 2, r1 * 2)
+                    self.backend.fill(*color)
+                    self.backend.stroke(None)
+                    self.backend.oval(x - r1, y - r1, r1 * 2, r1 * 2)
                     if not self.layers['point']:
-                        drawBot.oval(x + xIn - r2, y + yIn - r2, r2 * 2, r2 * 2)
-                        drawBot.oval(x + xOut - r2, y + yOut - r2, r2 * 2, r2 * 2)
+                        self.backend.oval(x + xIn - r2, y + yIn - r2, r2 * 2, r2 * 2)
+                        self.backend.oval(x + xOut - r2, y + yOut - r2, r2 * 2, r2 * 2)
 
-                    drawBot.fill(None)
-                    drawBot.stroke(*color)
-                    drawBot.strokeWidth(5)
-                    drawBot.line((x, y), (x + xIn, y + yIn))
-                    drawBot.line((x, y), (x + xOut, y + yOut))
+                    self.backend.fill(None)
+                    self.backend.stroke(*color)
+                    self.backend.strokeWidth(5)
+                    self.backend.line((x, y), (x + xIn, y + yIn))
+                    self.backend.line((x, y), (x + xOut, y + yOut))
 
-            drawBot.translate(glyph.width, 0)
-        drawBot.restore()
+            self.backend.translate(glyph.width + kern, 0)
+        self.backend.restore()
 
     def drawSegment(self):
 
         color = self.colorScheme.colorsRGB['segment']
         r = self.bPointSize * 0.5        
 
-        drawBot.save()
-        drawBot.fontSize(self.captionSize)
-        drawBot.font(self.captionFont)
-        for char in self.txt:
-            uni = ord(char)
-            glyphName = UV2AGL.get(uni)
-
-            # interpolate
-            g1 = self.font[glyphName].getLayer('regular')
-            g2 = self.font[glyphName].getLayer('bold')
-            glyph = RGlyph()
-            glyph.name = g1.name
-            glyph.unicode = g1.unicode
-            glyph.interpolate(self.interpolationFactor, g1, g2)
-
-            # draw segment contours
-            drawBot.stroke(*color)
-            drawBot.strokeWidth(self.segmentStrokeWidth)
-            drawBot.fill(None)
-
-            B = drawBot.BezierPath()
-            glyph.draw(B)
-            drawBot.drawPath(B)
-
-            # draw segment points
-            drawBot.stroke(None)
-            drawBot.fill(*color)
-            for x, y in B.onCurvePoints:
-                drawBot.oval(x - r, y - r, r * 2, r * 2)
-
-            drawBot.translate(glyph.width, 0)
-
-        drawBot.restore()
+        self.backend.save()
+        self.backend.fontSize(self.captionSize)
+        self.backend.font(self.captionFont)
+        layout = self.layout
+        for glyphName, kern in zip(layout.glyphNames, layout.kerning):
+            glyph = self.getGlyph(glyphName)
+
+            def drawSegments():
+                # draw segment contours
+                self.backend.stroke(*color)
+                self.backend.strokeWidth(self.segmentStrokeWidth)
+                self.backend.fill(None)
+
+                B = self.backend.BezierPath()
+                glyph.draw(B)
+                self.backend.drawPath(B)
+
+                # draw segment points
+                self.backend.stroke(None)
+                self.backend.fill(*color)
+                for x, y in B.onCurvePoints:
+                    self.backend.oval(x - r, y - r, r * 2, r * 2)
+
+            drawSymbol(self.backend, ('segment', color, self.segmentStrokeWidth, r, glyph.outlineKey), drawSegments)
+
+            self.backend.translate(glyph.width + kern, 0)
+
+        self.backend.restore()
+
+    def getLayerGlyphs(self, glyphNames, locations):
+        '''
+        Get glyphs interpolated between the designspace masters at several locations.
+        The instances of the last call are kept and reused until the glyphs, locations or masters change.
+
+        '''
+        instancer = self.instancer
+        locationsKey = tuple(tuple(sorted(location.items())) if isinstance(location, dict) else location for location in locations)
+        key = tuple(glyphNames), locationsKey, instancer
+        if self._layerGlyphs is None or key != self._layerGlyphsKey:
+            self._layerGlyphs = instancer.instances(glyphNames, locations)
+            self._layerGlyphsKey = key
+            self.profiler.count('interpolations', len(set(glyphNames)) * len(locations))
+        return self._layerGlyphs
 
     def drawLayer(self):
 
-        steps = 3
+        locations = self.layerLocations
+        if locations is None:
+            steps = self.layerSteps
+            if steps <= 1:
+                locations = [self.interpolationFactor]
+            else:
+                locations = [i * 1.0 / (steps - 1) for i in range(steps)]
+        steps = len(locations)
         alpha = 0.2 + 0.8 / (steps + 1)
         color = self.colorScheme.colorsRGB['layer']
 
-        drawBot.save()
+        self.backend.save()
 
-        # drawBot.fill(None)
-        # drawBot.stroke(*color)
-        # drawBot.strokeWidth(self.layerStrokeWidth)
+        # self.backend.fill(None)
+        # self.backend.stroke(*color)
+        # self.backend.strokeWidth(self.layerStrokeWidth)
 
         color += (alpha,)
-        drawBot.fill(*color)
-        drawBot.stroke(None)
-
-        for char in self.txt:
-            uni = ord(char)
-            glyphName = UV2AGL.get(uni)
+        self.backend.fill(*color)
+        self.backend.stroke(None)
 
-            g1 = self.font[glyphName].getLayer('regular')
-            g2 = self.font[glyphName].getLayer('bold')
+        layout = self.layout
+        layerGlyphs = self.getLayerGlyphs(layout.glyphNames, locations)
 
-            layerGlyphs = []
-            for i in range(steps):
-                factor = i * 1.0 / (steps - 1)
-                g3 = RGlyph()
-                g3.name = g1.name
-                g3.unicode = g1.unicode
-                g3.interpolate(factor, g1, g2)
-                layerGlyphs.append(g3)
+        for glyphName, kern in zip(layout.glyphNames, layout.kerning):
+            for glyphs in layerGlyphs:
+                B = self.backend.BezierPath()
+                glyphs[glyphName].draw(B)
+                self.backend.drawPath(B)
 
-            for g in layerGlyphs:
-                B = drawBot.BezierPath()
-                g.draw(B)
-                drawBot.drawPath(B)
+            self.backend.translate(layerGlyphs[-1][glyphName].width + kern, 0)
 
-            drawBot.translate(g2.width, 0)
-
-        drawBot.restore()
+        self.backend.restore()
 
     def draw(self, pos):
         x, y = pos
-        drawBot.save()
-        drawBot.translate(x, y)
-        drawBot.scale(self.scale)
-        if self.layers['font']:      self.drawFont()
-        if self.layers['layer']:     self.drawLayer()
-        if self.layers['info']:      self.drawInfo()
-        if self.layers['guideline']: self.drawGuideline()
-        if self.layers['glyph']:     self.drawGlyph()
-        if self.layers['font lib']:  self.drawFontLib()
-        if self.layers['kerning']:   self.drawKerning()
-        if self.layers['features']:  self.drawFeatures()
-        if self.layers['glyph lib']: self.drawGlyphLib()
-        if self.layers['anchor']:    self.drawAnchor()
-        if self.layers['component']: self.drawComponent()
-        if self.layers['image']:     self.drawImage()
-        if self.layers['contour']:   self.drawContour()
-        if self.layers['point']:     self.drawPoint()
-        if self.layers['bPoint']:    self.drawBPoint()
-        if self.layers['segment']:   self.drawSegment()
-
-        drawBot.restore()
+        self.backend.save()
+        self.backend.translate(x, y)
+        self.backend.scale(self.scale)
+
+        profiler = self.profiler
+        with profiler.phase('logotype.draw'), profiler.countCalls(self.backend):
+            with profiler.phase('getGlyphs'):
+                self.getGlyphs(self.glyphNames)
+            for layer, methodName in self.layerMethods:
+                if self.layers[layer]:
+                    with profiler.phase(layer):
+                        getattr(self, methodName)()
+
+        self.backend.restore()
 
 #---------
 # testing
@@ -536,8 +864,7 @@ if __name__ == '__main__':
 
     size('A4Landscape')
 
-    f = OpenFont(ufoPath)
-    L = FontPartsLogoType(f)
+    L = FontPartsLogoType.fromPath(ufoPath, useCache=True)
     L.interpolationFactor = 0.5
     L.draw((60, 100))
 
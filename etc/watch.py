@@ -0,0 +1,243 @@
+'''
+Watch mode for the FontParts objects document.
+
+The UFO is polled for changes to glyph files, font info, groups and kerning.
+Each change is mapped to the glyphs and layers it affects. Only those glyphs are read again
+and removed from the logotype caches, and only the pages which use the changed data
+or draw the changed glyphs are rendered again.
+
+'''
+
+import os
+import time
+import plistlib
+import pages
+from fontLoader import openFontSubset, updateFontSubset
+from geometryCache import getStamp
+
+
+# font-level files and the data they contain
+fontFiles = {
+    'fontinfo.plist' : 'fontinfo',
+    'groups.plist'   : 'groups',
+    'kerning.plist'  : 'kerning',
+}
+
+
+class UFOChanges:
+
+    '''
+    Changes found in one poll of a UFO.
+
+    '''
+
+    def __init__(self):
+        # changed font-level data: 'fontinfo', 'groups' and/or 'kerning'
+        self.sources = set()
+        # changed glyph names by layer name
+        self.glyphs = {}
+        # layers were added, removed or renamed
+        self.layers = False
+
+    def __bool__(self):
+        return bool(self.sources or self.glyphs or self.layers)
+
+    def addGlyph(self, layerName, glyphName):
+        self.glyphs.setdefault(layerName, set()).add(glyphName)
+
+
+class UFOWatcher:
+
+    '''
+    Find changed files in a UFO by comparing their modification times and sizes.
+
+    '''
+
+    def __init__(self, ufoPath):
+        self.ufoPath = ufoPath
+        self.layerDirectories = {}
+        self.fileNames = {}
+        self.readLayerContents()
+        self.stamps = self.scan()
+
+    def readPlist(self, *path):
+        with open(os.path.join(self.ufoPath, *path), 'rb') as f:
+            return plistlib.load(f)
+
+    def readLayerContents(self):
+        if os.path.exists(os.path.join(self.ufoPath, 'layercontents.plist')):
+            self.layerDirectories = {directory: layerName for layerName, directory in self.readPlist('layercontents.plist')}
+        else:
+            self.layerDirectories = {'glyphs': 'public.default'}
+        self.fileNames = {}
+        for directory in self.layerDirectories:
+            self.readContents(directory)
+
+    def readContents(self, directory):
+        '''
+        Map the file names in a glyphs directory to glyph names.
+
+        '''
+        try:
+            contents = self.readPlist(directory, 'contents.plist')
+        except FileNotFoundError:
+            contents = {}
+        self.fileNames[directory] = {fileName: glyphName for glyphName, fileName in contents.items()}
+
+    def scan(self):
+        stamps = {}
+        for fileName in list(fontFiles) + ['layercontents.plist']:
+            stamps[fileName] = getStamp(os.path.join(self.ufoPath, fileName))
+        for directory in os.listdir(self.ufoPath):
+            folder = os.path.join(self.ufoPath, directory)
+            if not directory.startswith('glyphs') or not os.path.isdir(folder):
+                continue
+            for fileName in os.listdir(folder):
+                stamps[f'{directory}/{fileName}'] = getStamp(os.path.join(folder, fileName))
+        return stamps
+
+    def poll(self):
+        '''
+        Get the changes since the last poll.
+
+        '''
+        stamps = self.scan()
+        changed = [path for path in set(stamps) | set(self.stamps) if stamps.get(path) != self.stamps.get(path)]
+        self.stamps = stamps
+
+        changes = UFOChanges()
+        if 'layercontents.plist' in changed:
+            self.readLayerContents()
+            changes.layers = True
+            return changes
+
+        # glyphs which were added, removed or renamed
+        oldFileNames = dict(self.fileNames)
+        for path in changed:
+            directory, _, fileName = path.partition('/')
+            if fileName == 'contents.plist' and directory in self.layerDirectories:
+                self.readContents(directory)
+                old = set(oldFileNames[directory].items())
+                new = set(self.fileNames[directory].items())
+                for fileName, glyphName in old ^ new:
+                    changes.addGlyph(self.layerDirectories[directory], glyphName)
+
+        for path in changed:
+            if path in fontFiles:
+                changes.sources.add(fontFiles[path])
+                continue
+            directory, _, fileName = path.partition('/')
+            if directory not in self.layerDirectories or not fileName.endswith('.glif'):
+                continue
+            glyphName = self.fileNames[directory].get(fileName, oldFileNames[directory].get(fileName))
+            if glyphName is not None:
+                changes.addGlyph(self.layerDirectories[directory], glyphName)
+
+        return changes
+
+
+class WatchSession:
+
+    '''
+    Keep the logotype, the map and the rendered pages of a document in memory,
+    and render only the pages affected by changes to the UFO.
+
+    '''
+
+    def __init__(self, jobs, ufoPath, typeAttrs, mapAttrs, folder, outputPath=None, thumbnails=False):
+        self.jobs = jobs
+        self.ufoPath = ufoPath
+        self.outputPath = outputPath
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        pages.initWorker(ufoPath, typeAttrs, mapAttrs, folder, thumbnails)
+        self.logotype = pages.getWorkerLogoType()
+        self.watcher = UFOWatcher(ufoPath)
+        self.pagePaths = [None for job in jobs]
+        self.render(jobs)
+
+    def render(self, jobs):
+        for job in jobs:
+            self.pagePaths[job.index] = pages.renderPageJob(job)
+        if jobs and self.outputPath:
+            pages.mergePages(self.pagePaths, self.outputPath)
+
+    def getAffectedJobs(self, sources, glyphs=()):
+        '''
+        Get the page jobs which draw layers using any of the given font data,
+        or any of the given `(font layer, glyph name)` pairs.
+
+        '''
+        L = self.logotype
+        glyphs = set(glyphs)
+        affected = []
+        for job in self.jobs:
+            if L.getSources(job.layers) & sources or glyphs & L.getUsedGlyphs(job.layers):
+                affected.append(job)
+        return affected
+
+    def update(self):
+        '''
+        Apply changes to the UFO since the last update, and render the affected pages again.
+        Returns the jobs which were rendered.
+
+        '''
+        changes = self.watcher.poll()
+        if not changes:
+            return []
+
+        L = self.logotype
+        if changes.layers:
+            # the layer structure has changed, so start from scratch
+            layerNames = set(L.masters) | set(L.designspace.keys())
+            L.font = openFontSubset(self.ufoPath, text=L.txt, layerNames=layerNames, useCache=True)
+            jobs = self.jobs
+
+        else:
+            updated = updateFontSubset(
+                L.font, self.ufoPath, changes.glyphs,
+                info='fontinfo' in changes.sources,
+                groups='groups' in changes.sources,
+                kerning='kerning' in changes.sources,
+                useCache=True)
+            sources = set(changes.sources)
+            glyphs = set()
+            if updated:
+                L.invalidateGlyphs(updated)
+                for layerName, glyphNames in changes.glyphs.items():
+                    glyphs.update((layerName, glyphName) for glyphName in glyphNames if glyphName in updated)
+            if sources & set(['groups', 'kerning']):
+                L.invalidateKerning()
+            jobs = self.getAffectedJobs(sources, glyphs)
+
+        self.render(jobs)
+        return jobs
+
+    def run(self, interval=0.5):
+        '''
+        Poll the UFO for changes until interrupted.
+
+        '''
+        print(f'watching {self.ufoPath}')
+        try:
+            while True:
+                start = time.perf_counter()
+                jobs = self.update()
+                if jobs:
+                    pageNumbers = ', '.join(str(job.index) for job in jobs)
+                    print(f'rendered pages {pageNumbers} in {time.perf_counter() - start:.2f} s')
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+
+    from objects import typeAttrs, mapAttrs, steps
+
+    folder = os.getcwd()
+    ufoPath = os.path.join(folder, 'FontParts.ufo')
+    jobs = pages.makePageJobs(list(typeAttrs['layers'].keys()), steps, True)
+
+    session = WatchSession(jobs, ufoPath, typeAttrs, mapAttrs, os.path.join(folder, 'pages'), os.path.join(folder, 'FontParts.gif'), thumbnails=True)
+    session.run()
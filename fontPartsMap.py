@@ -6,9 +6,22 @@ based on the classic [RoboFab Object Map](http://robofab.org/objects/model.html)
 import os
 import sys
 import math
-from drawBot import *
-from grapefruit import Color
+import random
+import shutil
+import tempfile
+import multiprocessing
+from math import cos, sin, radians
+from random import randint
 from collections import OrderedDict
+from types import MappingProxyType
+from mapLayout import TreeLayout, SpatialGrid, resolveOverlaps, distanceToSegment
+from profiling import nullProfiler
+from lazyImport import LazyModule
+from renderBackend import drawBotBackend, drawSymbol
+
+# rendering libraries are only imported when something is drawn or colors are calculated
+drawBot = LazyModule('drawBot')
+grapefruit = LazyModule('grapefruit')
 
 FontPartsConnections = [
     ('font',    'info'),
@@ -38,15 +51,114 @@ class FontPartsColorScheme:
         ['font', 'layer', 'glyph'],
     ]
 
-    baseColors = {
-        # use the original RoboFab colors for Font and Glyph objects
-        # calculate colors for all other objects from those two
-        'font'  : Color.from_hsl(80, 0.50, 0.49),
-        'glyph' : Color.from_hsl(38, 0.91, 0.69),
+    # use the original RoboFab colors for Font and Glyph objects, as (hue, saturation, lightness)
+    # calculate colors for all other objects from those two
+    _baseColorsHSL = {
+        'font'  : (80, 0.50, 0.49),
+        'glyph' : (38, 0.91, 0.69),
     }
 
+    # hue offsets between sub-objects in color sets 1, 2 and 3
+    _hueOffsets = (23, -15, -20)
+
+    # caption shadow colors
+    _shadowDarkness = 0.4
+    _shadowAlpha = 0.7
+
+    # dimmed colors are blended with white
+    _dimAmount = 0.5
+
     def __init__(self):
-        self.makeColors()
+        # own copy, so changes in place don't affect other color schemes
+        self._baseColorsHSL = dict(self._baseColorsHSL)
+        self.invalidate()
+
+    def invalidate(self):
+        '''
+        Clear the cached colors and lookup tables, so they are rebuilt when next needed.
+        Setting a color attribute does this automatically; call it after changing `baseColorsHSL` or `hueOffsets` in place.
+
+        '''
+        self._baseColors = None
+        self._colors = None
+        self._tables = None
+        self._tablesKey = None
+        self._alphaTables = {}
+
+    @property
+    def baseColorsHSL(self):
+        return self._baseColorsHSL
+
+    @baseColorsHSL.setter
+    def baseColorsHSL(self, hsl):
+        self._baseColorsHSL = dict(hsl)
+        self.invalidate()
+
+    @property
+    def hueOffsets(self):
+        return self._hueOffsets
+
+    @hueOffsets.setter
+    def hueOffsets(self, offsets):
+        self._hueOffsets = tuple(offsets)
+        self.invalidate()
+
+    @property
+    def shadowDarkness(self):
+        return self._shadowDarkness
+
+    @shadowDarkness.setter
+    def shadowDarkness(self, value):
+        self._shadowDarkness = value
+        self.invalidate()
+
+    @property
+    def shadowAlpha(self):
+        return self._shadowAlpha
+
+    @shadowAlpha.setter
+    def shadowAlpha(self, value):
+        self._shadowAlpha = value
+        self.invalidate()
+
+    @property
+    def dimAmount(self):
+        return self._dimAmount
+
+    @dimAmount.setter
+    def dimAmount(self, value):
+        self._dimAmount = value
+        self.invalidate()
+
+    @property
+    def baseColors(self):
+        '''
+        The base colors as `grapefruit.Color` objects, made from `baseColorsHSL` when first needed.
+
+        '''
+        if self._baseColors is None:
+            self._baseColors = {obj: grapefruit.Color.from_hsl(*hsl) for obj, hsl in self.baseColorsHSL.items()}
+        return self._baseColors
+
+    @baseColors.setter
+    def baseColors(self, colors):
+        self.baseColorsHSL = {obj: tuple(color.hsl) for obj, color in colors.items()}
+        self._baseColors = dict(colors)
+
+    @property
+    def colors(self):
+        '''
+        Colors for all objects, calculated when first needed.
+
+        '''
+        if self._colors is None:
+            self.makeColors()
+        return self._colors
+
+    @colors.setter
+    def colors(self, colors):
+        self.invalidate()
+        self._colors = dict(colors)
 
     def makeColors(self):
         '''
@@ -55,60 +167,126 @@ class FontPartsColorScheme:
 
         '''
         colors = self.baseColors.copy()
+        hueOffset1, hueOffset2, hueOffset3 = self.hueOffsets
 
         # color set 1: Font sub-objects
         for i, obj in enumerate(self.colorSets[0][1:]):
-            color = colors['font'].with_hue(colors['font'].hsl[0] + (i+1) * 23)
+            color = colors['font'].with_hue(colors['font'].hsl[0] + (i+1) * hueOffset1)
             colors[obj] = color
 
         # color set 2: Glyph sub-objects
         for i, obj in enumerate(self.colorSets[1][1:]):
-            color = colors['glyph'].with_hue(colors['glyph'].hsl[0] - (i+1) * 15)
+            color = colors['glyph'].with_hue(colors['glyph'].hsl[0] + (i+1) * hueOffset2)
             colors[obj] = color
 
         # color set 3: Contour sub-objects
         for i, obj in enumerate(self.colorSets[2][1:]):
-            color = colors['contour'].with_hue(colors['contour'].hsl[0] - (i+1) * 20)
+            color = colors['contour'].with_hue(colors['contour'].hsl[0] + (i+1) * hueOffset3)
             colors[obj] = color
 
         # color set 4: Layer
         colors['layer'] = colors['font'].blend(colors['glyph'], percent=0.5)
 
-        self.colors = colors
+        self._colors = colors
+
+    @property
+    def tablesKey(self):
+        '''
+        All settings which affect the color tables, stored when the tables are built.
+
+        '''
+        if self._tables is None:
+            self.tables
+        return self._tablesKey
+
+    def makeTablesKey(self):
+        # colors can also be set directly, so all of them are part of the key
+        colors = tuple((obj, color.rgb) for obj, color in sorted(self.colors.items()))
+        return colors, self.shadowDarkness, self.shadowAlpha, self.dimAmount
+
+    def makeTables(self):
+        '''
+        Convert all colors and their variants into lookup tables of color tuples.
+        Tables are stored by color mode and variant: `None`, `'shadow'` or `'dimmed'`.
+
+        '''
+        white = grapefruit.Color.from_rgb(1, 1, 1)
+        variants = {
+            None     : self.colors,
+            'shadow' : {obj: color.darker(self.shadowDarkness) for obj, color in self.colors.items()},
+            'dimmed' : {obj: color.blend(white, percent=self.dimAmount) for obj, color in self.colors.items()},
+        }
+        tables = {}
+        for variant, colors in variants.items():
+            alpha = (self.shadowAlpha,) if variant == 'shadow' else ()
+            tables['RGB',  variant] = MappingProxyType({obj: color.rgb + alpha for obj, color in colors.items()})
+            tables['CMYK', variant] = MappingProxyType({obj: color.cmyk + alpha for obj, color in colors.items()})
+        return MappingProxyType(tables)
+
+    @property
+    def tables(self):
+        '''
+        Color lookup tables, built when first needed and kept until the color settings change.
+
+        '''
+        if self._tables is None:
+            self._tables = self.makeTables()
+            self._tablesKey = self.makeTablesKey()
+        return self._tables
+
+    def getTable(self, mode='RGB', variant=None, alpha=None):
+        '''
+        Get a lookup table of color tuples, optionally with a given alpha value.
+
+        '''
+        table = self.tables[mode, variant]
+        if alpha is None:
+            return table
+        key = mode, variant, alpha
+        if key not in self._alphaTables:
+            self._alphaTables[key] = MappingProxyType({obj: color + (alpha,) for obj, color in table.items()})
+        return self._alphaTables[key]
 
     @property
     def colorsRGB(self):
-        colors = {}
-        for obj, color in self.colors.items():
-            colors[obj] = color.rgb
-        return colors
+        return self.getTable('RGB')
 
     @property
     def colorsCMYK(self):
-        colors = {}
-        for obj, color in self.colors.items():
-            colors[obj] = color.cmyk
-        return colors
+        return self.getTable('CMYK')
 
     def drawSwatches(self, pos, cellSize, padding, captions=False):
         x, y = pos
         w, h = cellSize
-        save()
-        translate(x, y)
-        fontSize(w * .12)
+        drawBot.save()
+        drawBot.translate(x, y)
+        drawBot.fontSize(w * .12)
         for colorSet in reversed(self.colorSets):
-            save()
+            drawBot.save()
             for obj in colorSet:
                 color = self.colorsRGB[obj]
-                fill(*color)
-                rect(0, 0, w, h)
+                drawBot.fill(*color)
+                drawBot.rect(0, 0, w, h)
                 if captions:
-                    fill(0)
-                    text(obj, (w * .1, h * .2))
-                translate(w + padding, 0)
-            restore()
-            translate(0, (h + padding))
-        restore()
+                    drawBot.fill(0)
+                    drawBot.text(obj, (w * .1, h * .2))
+                drawBot.translate(w + padding, 0)
+            drawBot.restore()
+            drawBot.translate(0, (h + padding))
+        drawBot.restore()
+
+class FontPartsDisplayList:
+
+    '''
+    Recorded geometry of a map: gradient strokes or lines, circles and captions.
+    Colors are not recorded, so a display list can be replayed with different styles.
+
+    '''
+
+    def __init__(self, lines, circles, captions):
+        self.lines = lines
+        self.circles = circles
+        self.captions = captions
 
 class FontPartsMapMaker:
 
@@ -152,6 +330,8 @@ class FontPartsMapMaker:
     # toggle object names
     textDraw  = True
     textColor = 1,
+    textShadowDistance = 2, -2
+    textShadowBlur     = 5
 
     # connection lines
     linesStrokeColor = 0.6,
@@ -169,12 +349,44 @@ class FontPartsMapMaker:
     circlesShadowColor    = 0, 0.25
 
     # settings for dimmed objects
+    # a single color for all dimmed objects
+    # set to `None` to use the dimmed colors of the color scheme instead
     dimColor = 0.5,
     dimObjects = []
 
     # randomize positions
     randomness = 0
 
+    # generic layout for any graph of connections: None (fixed FontParts layout), 'radial' or 'tidy'
+    layoutMode = None
+    layoutLevelDistance = 200
+    layoutSiblingDistance = 150
+    layoutAngleStart = 0
+    layoutAngleEnd = 360
+
+    # draw shadowed circles and captions as cached pre-rendered images
+    sprites = False
+    spritesScale = 2
+    spritesCacheSize = 512
+
+    # rendered images of the whole map, in pixels per point
+    thumbnailsResolution = 4
+    thumbnailsCacheSize = 32
+
+    # set to a `profiling.Profiler` to record timings of each drawing phase
+    profiler = nullProfiler
+
+    # backend which draws the map, see `renderBackend`
+    backend = drawBotBackend
+
+    # maximum number of cached gradient line outlines
+    strokeCacheSize = 2048
+
+    # move overlapping circles apart
+    circlesAvoidOverlaps = False
+    circlesPadding = 5
+    circlesOverlapIterations = 20
+
     tree = {
         'font'    : ['font lib', 'info', 'groups', 'kerning', 'features'],
         'glyph'   : ['glyph lib', 'anchor', 'component', 'image', 'guideline', 'contour'],
@@ -182,6 +394,37 @@ class FontPartsMapMaker:
     }
 
     positions = {}
+    parents = {}
+
+    # steps for calculating the fixed FontParts layout, in order:
+    # method name, parameters used by the step, and previous steps whose positions it builds upon
+    positionSteps = [
+        ('makeFontPosition',              ['pos'],                                                      []),
+        ('makeFontSubObjectPositions',    ['length1', 'angle1', 'angleStart1'],                         ['makeFontPosition']),
+        ('makeLayerPosition',             ['length2', 'angleStart0'],                                   ['makeFontPosition']),
+        ('makeGlyphPosition',             ['length2', 'angleStart4'],                                   ['makeLayerPosition']),
+        ('makeGlyphSubObjectPositions',   ['length1', 'angle2', 'angleStart2'],                         ['makeGlyphPosition']),
+        ('makeContourSubObjectPositions', ['length1', 'radius1', 'radius2', 'angle3', 'angleStart3'],   ['makeGlyphSubObjectPositions']),
+    ]
+
+    # attributes which affect the geometry of the map
+    geometryAttributes = [
+        'radius1', 'radius2', 'length1', 'length2',
+        'angle1', 'angle2', 'angle3',
+        'angleStart0', 'angleStart1', 'angleStart2', 'angleStart3', 'angleStart4',
+        'linesDraw', 'linesGradient', 'linesStrokeWidth',
+        'textDraw', 'fontSize1', 'fontSize2',
+        'layoutMode', 'layoutLevelDistance', 'layoutSiblingDistance', 'layoutAngleStart', 'layoutAngleEnd',
+        'circlesAvoidOverlaps', 'circlesPadding', 'circlesOverlapIterations',
+    ]
+
+    # attributes which affect how the map looks, apart from its geometry
+    styleAttributes = [
+        'colorMode', 'font', 'textColor', 'textShadowDistance', 'textShadowBlur',
+        'linesStrokeColor', 'linesDash',
+        'circlesShadowDraw', 'circlesShadowDistance', 'circlesShadowBlur', 'circlesShadowColor',
+        'dimColor',
+    ]
 
     def setAttributes(self, attrsDict):
         '''
@@ -191,38 +434,143 @@ class FontPartsMapMaker:
         for key, value in attrsDict.items():
             setattr(self, key, value)
 
-    def makePositions(self, pos):
+    def __getstate__(self):
+        '''
+        Cached geometry and images contain drawBot objects which can't be sent to worker processes, so they are left out.
+
+        '''
+        state = dict(self.__dict__)
+        for attr in ['_displayList', '_displayParameters', '_displayPositions', '_strokeCache', '_spriteCache', '_thumbnails']:
+            state.pop(attr, None)
+        return state
+
+    def invalidateCaches(self):
+        '''
+        Forget the cached display list, stroke outlines, sprites and thumbnails, so the next draw starts from scratch.
+
+        '''
+        self._displayParameters = None
+        self._strokeCache = None
+        self._spriteCache = None
+        self._thumbnails = None
+
+    @property
+    def objectNames(self):
+        '''
+        Names of all objects in the map, in drawing order.
+
+        '''
+        if self.layoutMode is not None:
+            return TreeLayout(self.connections).nodes
+        return ['font'] + self.tree['font'] + ['layer', 'glyph'] + self.tree['glyph'] + self.tree['contour']
+
+    def makeJitter(self, frames, seed=None):
+        '''
+        Calculate random position offsets for all objects in a number of frames.
+
+        All values are generated up front from a single seeded random generator,
+        so the same seed always gives the same offsets.
+        Returns a list with one dict of `(dx, dy)` offsets per frame.
+
+        '''
+        rng = random.Random(seed)
+        objectNames = self.objectNames
+        r = self.randomness
+        values = [rng.randint(-r, r) for i in range(frames * len(objectNames) * 2)]
+        jitter = []
+        for frame in range(frames):
+            i = frame * len(objectNames) * 2
+            offsets = {}
+            for j, obj in enumerate(objectNames):
+                offsets[obj] = values[i + j * 2], values[i + j * 2 + 1]
+            jitter.append(offsets)
+        return jitter
+
+    def makePositions(self, pos, offsets=None):
         '''
         Calculate object positions and store them in a dict.
 
+        Positions are randomized with the given offsets, or with random values if `randomness` is set.
+        Overlapping circles are moved apart if `circlesAvoidOverlaps` is set.
+
         '''
-        x, y = pos
+        self.positions = {}
+        if self.layoutMode is not None:
+            self.makeLayoutPositions(pos)
+        else:
+            self.makeFontPartsPositions(pos)
+
+        # randomize
+        if offsets is not None:
+            for obj, (dx, dy) in offsets.items():
+                x, y = self.positions[obj]
+                self.positions[obj] = x + dx, y + dy
+
+        elif self.randomness != 0:
+            for obj, (x, y) in self.positions.items():
+                x += randint(-self.randomness, self.randomness)
+                y += randint(-self.randomness, self.randomness)
+                self.positions[obj] = x, y
+
+        # resolve overlaps, keeping the first object in place
+        if self.circlesAvoidOverlaps and self.positions:
+            radii = {obj: self.getRadius(obj) for obj in self.positions}
+            fixed = [next(iter(self.positions))]
+            self.positions = resolveOverlaps(self.positions, radii, self.circlesPadding, self.circlesOverlapIterations, fixed)
+
+    def makeLayoutPositions(self, pos):
+        '''
+        Calculate object positions for any graph of connections with a generic tree layout.
+
+        '''
+        layout = TreeLayout(self.connections)
+        if self.layoutMode == 'radial':
+            positions = layout.radial(pos, self.layoutLevelDistance, self.layoutAngleStart, self.layoutAngleEnd)
+        elif self.layoutMode == 'tidy':
+            positions = layout.tidy(pos, self.layoutLevelDistance, self.layoutSiblingDistance)
+        else:
+            raise ValueError(f"Unknown layout mode '{self.layoutMode}'.")
+        self.positions.update(positions)
+        self.parents = layout.parents
+
+    def makeFontPartsPositions(self, pos):
+        '''
+        Calculate object positions for the FontParts object tree, using fixed angles and distances.
 
-        # font etc.
-        xFont, yFont = x, y
-        self.positions['font'] = xFont, yFont
+        '''
+        for step, parameters, dependencies in self.positionSteps:
+            getattr(self, step)(pos)
+
+    def makeFontPosition(self, pos):
+        self.positions['font'] = tuple(pos)
+
+    def makeFontSubObjectPositions(self, pos):
+        xFont, yFont = self.positions['font']
         for i, obj in enumerate(self.tree['font']):
             x_ = xFont + cos(radians(self.angleStart1 + self.angle1 * i)) * self.length1
             y_ = yFont + sin(radians(self.angleStart1 + self.angle1 * i)) * self.length1
             self.positions[obj] = x_, y_
 
-        # layer
+    def makeLayerPosition(self, pos):
+        xFont, yFont = self.positions['font']
         xLayer = xFont + cos(radians(self.angleStart0)) * self.length2
         yLayer = yFont + sin(radians(self.angleStart0)) * self.length2
-
         self.positions['layer'] = xLayer, yLayer
 
-        # glyph etc.
+    def makeGlyphPosition(self, pos):
+        xLayer, yLayer = self.positions['layer']
         xGlyph = xLayer + cos(radians(self.angleStart4)) * self.length2
         yGlyph = yLayer + sin(radians(self.angleStart4)) * self.length2
-
         self.positions['glyph'] = xGlyph, yGlyph
+
+    def makeGlyphSubObjectPositions(self, pos):
+        xGlyph, yGlyph = self.positions['glyph']
         for i, obj in enumerate(self.tree['glyph']):
             x_ = xGlyph + cos(radians(self.angleStart2 - self.angle2 * i)) * self.length1
             y_ = yGlyph + sin(radians(self.angleStart2 - self.angle2 * i)) * self.length1
             self.positions[obj] = x_, y_
 
-        # point etc.
+    def makeContourSubObjectPositions(self, pos):
         xContour, yContour = self.positions['contour']
         length = self.length1 - (self.radius2 - self.radius1)
         for i, obj in enumerate(self.tree['contour']):
@@ -230,181 +578,777 @@ class FontPartsMapMaker:
             y_ = yContour + sin(radians(self.angleStart3 + self.angle3 * i)) * length
             self.positions[obj] = x_, y_
 
-        # randomize
-        if self.randomness != 0:
-            for obj, (x, y) in self.positions.items():
-                x += randint(-self.randomness, self.randomness)
-                y += randint(-self.randomness, self.randomness)
-                self.positions[obj] = x, y
+    def getRadius(self, obj):
+        return self.radius1 if obj not in ['font', 'glyph'] else self.radius2
 
-    def drawLines(self):
+    def getColorKey(self, obj):
         '''
-        Draw lines connecting objects to sub-objects.
+        Objects without a color of their own use the color of their closest parent.
+
+        '''
+        colors = self.colors.colors
+        while obj not in colors and obj in self.parents:
+            obj = self.parents[obj]
+        return obj
+
+    def getColor(self, obj, colorOverrides=None):
+        '''
+        Get the fill color of an object, taking dimmed objects and color overrides into account.
+        Dimmed objects use `dimColor`, or the scheme's dimmed colors if it is `None`.
+
+        '''
+        if colorOverrides and obj in colorOverrides:
+            return colorOverrides[obj]
+        if obj in self.dimObjects:
+            if self.dimColor is not None:
+                return self.dimColor
+            return self.colors.getTable(self.colorMode, 'dimmed')[self.getColorKey(obj)]
+        return self.colors.getTable(self.colorMode)[self.getColorKey(obj)]
+
+    def getStroke(self, pt1, pt2, r1, r2):
+        '''
+        Get the outline of a gradient line between two points, and the gradient start and end points
+        on the edges of the circles.
+
+        Outlines are cached per endpoints, radii and stroke width, so they can be reused
+        across pages, frames and dimmed states. Only the most recently used `strokeCacheSize` outlines are kept.
+
+        '''
+        cache = getattr(self, '_strokeCache', None)
+        if cache is None:
+            cache = self._strokeCache = OrderedDict()
+
+        key = pt1, pt2, r1, r2, self.linesStrokeWidth, self.backend
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        B = self.backend.BezierPath()
+        B.moveTo(pt1)
+        B.lineTo(pt2)
+        B2 = B.expandStroke(self.linesStrokeWidth)
+
+        dx = pt2[0] - pt1[0]
+        dy = pt2[1] - pt1[1]
+
+        aRadians = math.atan2(dy, dx)
+
+        x1 = pt1[0] + r1 * cos(aRadians)
+        y1 = pt1[1] + r1 * sin(aRadians)
+
+        x2 = pt2[0] - r2 * cos(aRadians)
+        y2 = pt2[1] - r2 * sin(aRadians)
+
+        cache[key] = B2, (x1, y1), (x2, y2)
+        while len(cache) > self.strokeCacheSize:
+            cache.popitem(last=False)
+        return cache[key]
+
+    def compileLine(self, obj1, obj2):
+        '''
+        Calculate the geometry of the line connecting two objects.
+
+        '''
+        pt1 = self.positions[obj1]
+        pt2 = self.positions[obj2]
+
+        if not self.linesGradient:
+            return obj1, obj2, None, pt1, pt2
+
+        B2, gradientStart, gradientEnd = self.getStroke(pt1, pt2, self.getRadius(obj1), self.getRadius(obj2))
+        return obj1, obj2, B2, gradientStart, gradientEnd
+
+    def compileLines(self):
+        '''
+        Calculate the geometry of the lines connecting objects to sub-objects.
 
         '''
         if not self.linesDraw:
-            return
+            return []
+        return [self.compileLine(obj1, obj2) for obj1, obj2 in self.connections]
+
+    def compileCircle(self, obj):
+        x, y = self.positions[obj]
+        r = self.getRadius(obj)
+        return obj, (x - r, y - r, r * 2, r * 2)
+
+    def compileCircles(self):
+        '''
+        Calculate the geometry of the circle representing each object.
+
+        '''
+        return [self.compileCircle(obj) for obj in self.positions]
+
+    def compileCaption(self, obj):
+        x, y = self.positions[obj]
+        if obj not in ['font', 'glyph']:
+            r = self.radius1
+            size = self.fontSize1
+            h = r - self.fontSize1 * -0.6
+        else:
+            r = self.radius2
+            size = self.fontSize2
+            h = r - self.fontSize2 * -0.65
+
+        txt = obj.split('.')[-1]
+        if len(txt.split('_')) > 1:
+            txt = txt.split('_')[-1]
+
+        return obj, txt, size, (x - r, y - r, r * 2, h)
+
+    def compileCaptions(self):
+        '''
+        Calculate the text boxes with the name of each object.
 
-        save()
+        '''
+        if not self.textDraw:
+            return []
+        return [self.compileCaption(obj) for obj in self.positions]
 
-        for obj1, obj2 in self.connections:
+    def compile(self, pos=(0, 0), offsets=None):
+        '''
+        Calculate object positions and all map geometry, and record it in a display list.
 
-            if self.linesGradient:
+        '''
+        with self.profiler.phase('makePositions'):
+            self.makePositions(pos, offsets)
+        return FontPartsDisplayList(self.compileLines(), self.compileCircles(), self.compileCaptions())
 
-                B = BezierPath()
-                B.moveTo(self.positions[obj1])
-                B.lineTo(self.positions[obj2])
-                B2 = B.expandStroke(self.linesStrokeWidth)
+    def recompile(self, pos, changedParameters):
+        '''
+        Update the current display list after some position parameters of the fixed FontParts layout have changed.
 
-                r1 = self.radius1 if obj1 not in ['font', 'glyph'] else self.radius2
-                r2 = self.radius1 if obj2 not in ['font', 'glyph'] else self.radius2
+        Only the position steps which use the changed parameters, and the steps depending on them, are calculated again.
+        Then only the circles and captions of objects which have moved, and the lines touching them, are compiled again.
 
-                dx = self.positions[obj2][0] - self.positions[obj1][0]
-                dy = self.positions[obj2][1] - self.positions[obj1][1]
+        '''
+        oldPositions = self.positions
+        self.positions = dict(oldPositions)
 
-                aRadians = math.atan2(dy, dx)
+        dirtySteps = set()
+        for step, parameters, dependencies in self.positionSteps:
+            if changedParameters.intersection(parameters) or dirtySteps.intersection(dependencies):
+                getattr(self, step)(pos)
+                dirtySteps.add(step)
 
-                x1 = self.positions[obj1][0] + r1 * cos(aRadians)
-                y1 = self.positions[obj1][1] + r1 * sin(aRadians)
+        moved = set(obj for obj, pt in self.positions.items() if oldPositions.get(obj) != pt)
+        return self.recompileObjects(moved)
 
-                x2 = self.positions[obj2][0] - r2 * cos(aRadians)
-                y2 = self.positions[obj2][1] - r2 * sin(aRadians)
+    def recompileObjects(self, moved):
+        '''
+        Update the current display list for objects which have moved: their circles and captions, and the lines touching them.
 
-                if self.colorMode == 'CMYK':
-                    c1 = self.colors.colorsCMYK[obj1] if not obj1 in self.dimObjects else self.dimColor
-                    c2 = self.colors.colorsCMYK[obj2] if not obj2 in self.dimObjects else self.dimColor
-                else:
-                    c1 = self.colors.colorsRGB[obj1] if not obj1 in self.dimObjects else self.dimColor
-                    c2 = self.colors.colorsRGB[obj2] if not obj2 in self.dimObjects else self.dimColor
+        '''
+        displayList = self._displayList
+        lines = [self.compileLine(item[0], item[1]) if item[0] in moved or item[1] in moved else item for item in displayList.lines]
+        circles = [self.compileCircle(item[0]) if item[0] in moved else item for item in displayList.circles]
+        captions = [self.compileCaption(item[0]) if item[0] in moved else item for item in displayList.captions]
+        return FontPartsDisplayList(lines, circles, captions)
+
+    @property
+    def geometryParameters(self):
+        '''
+        All attributes which affect the map geometry, as a dict.
+
+        '''
+        parameters = {attr: getattr(self, attr, None) for attr in self.geometryAttributes}
+        parameters['tree'] = tuple((obj, tuple(subObjects)) for obj, subObjects in self.tree.items())
+        parameters['connections'] = tuple(self.connections)
+        # display lists contain paths made by the backend
+        parameters['backend'] = self.backend
+        return parameters
+
+    @property
+    def positionParameters(self):
+        '''
+        Parameters which only affect object positions in the fixed FontParts layout.
+
+        '''
+        parameters = set()
+        for step, stepParameters, dependencies in self.positionSteps:
+            parameters.update(stepParameters)
+        # radii also change the size of circles and captions
+        return parameters - set(['radius1', 'radius2'])
+
+    def getDisplayList(self, pos=(0, 0), offsets=None):
+        '''
+        Get a display list for the current geometry.
+
+        Display lists are cached and reused until an attribute which affects geometry is changed.
+        If only position parameters of the fixed FontParts layout have changed, the cached display list
+        is updated incrementally, so that for example changing `angle3` only recalculates the contour sub-objects.
+        Maps with random positions are compiled every time.
+
+        '''
+        if offsets is not None or self.randomness != 0:
+            self._displayParameters = None
+            return self.compile(pos, offsets)
+
+        parameters = self.geometryParameters
+        parameters['pos'] = tuple(pos)
+        previous = getattr(self, '_displayParameters', None)
+        if previous == parameters:
+            return self._displayList
+
+        # positions may have been replaced since the display list was made
+        incremental = previous is not None and self.positions is self._displayPositions
+        incremental = incremental and self.layoutMode is None and not self.circlesAvoidOverlaps
+        if incremental:
+            changed = set(name for name, value in parameters.items() if previous[name] != value)
+            incremental = changed.issubset(self.positionParameters)
+
+        if incremental:
+            self._displayList = self.recompile(pos, changed)
+        else:
+            self._displayList = self.compile(pos)
+        self._displayParameters = parameters
+        self._displayPositions = self.positions
+        return self._displayList
+
+    def drawLines(self, lines=None, colorOverrides=None):
+        '''
+        Draw lines connecting objects to sub-objects.
 
-                linearGradient(
-                    (x1, y1), (x2, y2),
+        '''
+        if lines is None:
+            lines = self.compileLines()
+
+        self.backend.save()
+
+        for obj1, obj2, B2, pt1, pt2 in lines:
+
+            if B2 is not None:
+
+                c1 = self.getColor(obj1, colorOverrides)
+                c2 = self.getColor(obj2, colorOverrides)
+
+                self.backend.linearGradient(
+                    pt1, pt2,
                     [c1, c2],
                     [0, 1])
 
-                drawPath(B2)
+                self.backend.drawPath(B2)
 
             else:
-                lineDash(*self.linesDash)
-                stroke(*self.linesStrokeColor)
-                strokeWidth(self.linesStrokeWidth)
-                lineCap('round')
-                line(self.positions[obj1], self.positions[obj2])
+                self.backend.lineDash(*self.linesDash)
+                self.backend.stroke(*self.linesStrokeColor)
+                self.backend.strokeWidth(self.linesStrokeWidth)
+                self.backend.lineCap('round')
+                self.backend.line(pt1, pt2)
+
+        self.backend.restore()
+
+    def getSprite(self, key, boxSize, margin, drawFunc):
+        '''
+        Get a pre-rendered image of a styled circle or caption.
 
-        restore()
+        Sprites are rendered once at `spritesScale` with a margin for the shadow, and cached by their style key.
+        Only the most recently used `spritesCacheSize` sprites are kept.
 
-    def drawCircles(self):
+        '''
+        cache = getattr(self, '_spriteCache', None)
+        if cache is None:
+            cache = self._spriteCache = OrderedDict()
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
+        w, h = boxSize
+        s = self.spritesScale
+        im = drawBot.ImageObject()
+        with im:
+            drawBot.size((w + margin * 2) * s, (h + margin * 2) * s)
+            drawBot.scale(s)
+            drawBot.translate(margin, margin)
+            drawFunc()
+
+        cache[key] = im
+        while len(cache) > self.spritesCacheSize:
+            cache.popitem(last=False)
+        return im
+
+    def placeSprite(self, im, pos, margin):
+        x, y = pos
+        self.backend.save()
+        self.backend.translate(x - margin, y - margin)
+        self.backend.scale(1.0 / self.spritesScale)
+        self.backend.image(im, (0, 0))
+        self.backend.restore()
+
+    def drawCircleSprites(self, circles, colorOverrides=None):
+        distance = tuple(self.circlesShadowDistance)
+        blur = self.circlesShadowBlur
+        shadowColor = tuple(self.circlesShadowColor)
+        margin = blur * 2 + max(abs(v) for v in distance)
+
+        for obj, (x, y, w, h) in circles:
+            color = tuple(self.getColor(obj, colorOverrides))
+
+            def drawCircle():
+                drawBot.stroke(None)
+                drawBot.shadow(distance, blur=blur, color=shadowColor)
+                drawBot.fill(*color)
+                drawBot.oval(0, 0, w, h)
+
+            key = 'circle', w, h, color, distance, blur, shadowColor, self.spritesScale
+            self.placeSprite(self.getSprite(key, (w, h), margin, drawCircle), (x, y), margin)
+
+    def drawCircles(self, circles=None, colorOverrides=None):
         '''
         Draw a circle representing each object.
 
         '''
-        save()
-        stroke(None)
+        if circles is None:
+            circles = self.compileCircles()
+
+        if self.sprites and self.circlesShadowDraw and self.backend.imageObjects:
+            self.drawCircleSprites(circles, colorOverrides)
+            return
+
+        self.backend.save()
+        self.backend.stroke(None)
 
         if self.circlesShadowDraw:
-            shadow(self.circlesShadowDistance, blur=self.circlesShadowBlur, color=self.circlesShadowColor)
+            self.backend.shadow(self.circlesShadowDistance, blur=self.circlesShadowBlur, color=self.circlesShadowColor)
 
-        for obj, pos in self.positions.items():
-            x, y = pos
-            r = self.radius1 if obj not in ['font', 'glyph'] else self.radius2
+        for obj, box in circles:
+            self.backend.fill(*self.getColor(obj, colorOverrides))
+            self.backend.oval(*box)
 
-            if self.colorMode == 'CMYK':
-                c = self.colors.colorsCMYK[obj] if obj not in self.dimObjects else self.dimColor
-            else:
-                c = self.colors.colorsRGB[obj] if obj not in self.dimObjects else self.dimColor
+        self.backend.restore()
+
+    @property
+    def captionMargin(self):
+        '''
+        Space around a caption box which its shadow can reach.
+
+        '''
+        return self.textShadowBlur * 2 + max(abs(v) for v in self.textShadowDistance)
+
+    def drawCaptionSprites(self, captions):
+        shadowColors = self.colors.getTable(self.colorMode, 'shadow')
+        textColor = tuple(self.textColor)
+        distance = tuple(self.textShadowDistance)
+        blur = self.textShadowBlur
+        margin = self.captionMargin
+
+        for obj, txt, size, (x, y, w, h) in captions:
+            shadowColor = tuple(shadowColors[self.getColorKey(obj)])
 
-            fill(*c)
-            oval(x - r, y - r, r*2, r*2)
+            def drawCaption():
+                drawBot.fill(*textColor)
+                drawBot.font(self.font)
+                drawBot.shadow(distance, blur=blur, color=shadowColor)
+                drawBot.fontSize(size)
+                drawBot.textBox(txt, (0, 0, w, h), align='center')
 
-        restore()
+            key = 'caption', txt, size, w, h, self.font, textColor, distance, blur, shadowColor, self.spritesScale
+            self.placeSprite(self.getSprite(key, (w, h), margin, drawCaption), (x, y), margin)
 
-    def drawCaptions(self):
+    def drawCaptions(self, captions=None):
         '''
         Draw the name of each object.
         
         '''
-        if not self.textDraw:
+        if captions is None:
+            captions = self.compileCaptions()
+
+        if not captions:
             return
 
-        save()
-        fill(*self.textColor)
-        font(self.font)
+        if self.sprites and self.backend.imageObjects:
+            self.drawCaptionSprites(captions)
+            return
 
-        for obj in self.positions.keys():
-            x, y = self.positions[obj]
-            c = self.colors.colors[obj].darker(0.4)
-            c = c.cmyk if self.colorMode == 'CMYK' else c.rgb
-            c += (0.7,)
-            shadow((2, -2), blur=5, color=c)
+        self.backend.save()
+        self.backend.fill(*self.textColor)
+        self.backend.font(self.font)
 
-            if obj not in ['font', 'glyph']:
-                r = self.radius1
-                fontSize(self.fontSize1)
-                h = r - self.fontSize1 * -0.6
+        shadowColors = self.colors.getTable(self.colorMode, 'shadow')
+        for obj, txt, size, box in captions:
+            self.backend.shadow(self.textShadowDistance, blur=self.textShadowBlur, color=shadowColors[self.getColorKey(obj)])
+            self.backend.fontSize(size)
+            self.backend.textBox(txt, box, align='center')
 
-            else:
-                r = self.radius2
-                fontSize(self.fontSize2)
-                h = r - self.fontSize2 * -0.65
+        self.backend.restore()
 
-            if len(obj.split('_')) > 1:
-                obj = obj.split('_')[-1]
-
-            textBox(obj, (x - r, y - r, r * 2, h), align='center')
+    def replay(self, displayList, colorOverrides=None):
+        '''
+        Draw a display list with the current styles and dimmed objects.
 
-        restore()
+        Colors of individual objects can be changed with a dict of color overrides.
 
-    def draw(self, pos=(0, 0)):
+        '''
+        profiler = self.profiler
+        with profiler.phase('drawLines'):
+            self.drawLines(displayList.lines, colorOverrides)
+        with profiler.phase('drawCircles'):
+            self.drawCircles(displayList.circles, colorOverrides)
+        with profiler.phase('drawCaptions'):
+            self.drawCaptions(displayList.captions)
+
+    def draw(self, pos=(0, 0), offsets=None, colorOverrides=None):
         '''
         Draw the FontParts object map at a given position.
 
         The origin point is the center of the Font circle.
 
         '''
-        self.makePositions(pos)
-        self.drawLines()
-        self.drawCircles()
-        self.drawCaptions()
+        profiler = self.profiler
+        backend = self.backend
+
+        def drawMap():
+            with profiler.phase('getDisplayList'):
+                displayList = self.getDisplayList(pos, offsets)
+            self.replay(displayList, colorOverrides)
+
+        with profiler.phase('map.draw'), profiler.countCalls(backend):
+            if backend.symbols and offsets is None and self.randomness == 0:
+                # the same map drawn again, for example on another page, is reused
+                drawSymbol(backend, ('map', tuple(pos), self.appearanceKey(colorOverrides)), drawMap)
+            else:
+                drawMap()
+
+    def getBounds(self, displayList):
+        '''
+        Get the bounding box `(xMin, yMin, xMax, yMax)` of a display list, including shadows.
+
+        '''
+        boxes = [box for obj, box in displayList.circles] + [box for obj, txt, size, box in displayList.captions]
+        if not boxes:
+            return 0, 0, 0, 0
+        xMin = min(x for x, y, w, h in boxes)
+        yMin = min(y for x, y, w, h in boxes)
+        xMax = max(x + w for x, y, w, h in boxes)
+        yMax = max(y + h for x, y, w, h in boxes)
+
+        margin = self.linesStrokeWidth
+        if displayList.captions:
+            margin = max(margin, self.captionMargin)
+        if self.circlesShadowDraw:
+            margin = max(margin, self.circlesShadowBlur * 2 + max(abs(v) for v in self.circlesShadowDistance))
+        return xMin - margin, yMin - margin, xMax + margin, yMax + margin
+
+    @property
+    def styleKey(self):
+        '''
+        All attributes which affect how the map looks, apart from its geometry.
+
+        '''
+        values = [getattr(self, attr, None) for attr in self.styleAttributes]
+        return tuple(tuple(value) if isinstance(value, list) else value for value in values), self.colors.tablesKey
+
+    def appearanceKey(self, colorOverrides=None):
+        '''
+        Everything which affects how the map is drawn: dimmed objects, color overrides, styles and geometry.
+
+        '''
+        overrides = tuple(sorted((obj, tuple(color)) for obj, color in colorOverrides.items())) if colorOverrides else None
+        geometry = tuple(self.geometryParameters.items()), getattr(self, '_movedCount', 0)
+        return tuple(sorted(self.dimObjects)), overrides, self.styleKey, geometry
+
+    def getThumbnail(self, scaleFactor=1, colorOverrides=None):
+        '''
+        Get a rendered image of the whole map with the current dimmed objects.
+
+        Thumbnails are rendered once per dimmed state, scale, style and geometry, and reused afterwards,
+        so placing the same map on many pages costs almost nothing.
+        Returns the image and the position of its bottom left corner relative to the map origin, in unscaled units.
+
+        '''
+        thumbnails = getattr(self, '_thumbnails', None)
+        if thumbnails is None:
+            thumbnails = self._thumbnails = OrderedDict()
+
+        key = self.appearanceKey(colorOverrides), scaleFactor, self.thumbnailsResolution
+        if key in thumbnails:
+            thumbnails.move_to_end(key)
+            return thumbnails[key]
+
+        displayList = self.getDisplayList()
+        xMin, yMin, xMax, yMax = self.getBounds(displayList)
+        s = scaleFactor * self.thumbnailsResolution
+
+        im = drawBot.ImageObject()
+        with im:
+            drawBot.size(math.ceil((xMax - xMin) * s), math.ceil((yMax - yMin) * s))
+            drawBot.scale(s)
+            drawBot.translate(-xMin, -yMin)
+            self.replay(displayList, colorOverrides)
+
+        thumbnails[key] = im, (xMin, yMin)
+        while len(thumbnails) > self.thumbnailsCacheSize:
+            thumbnails.popitem(last=False)
+        return thumbnails[key]
+
+    def drawThumbnail(self, pos=(0, 0), scaleFactor=1, colorOverrides=None):
+        '''
+        Place a rendered image of the map at a given position and scale.
+
+        Looks like `draw` inside `scale(scaleFactor)`, but the map is only rendered the first time.
+        Backends which can't draw images draw the map instead.
+
+        '''
+        backend = self.backend
+        x, y = pos
+        if not backend.imageObjects:
+            # vector backends draw the map itself
+            backend.save()
+            backend.translate(x, y)
+            backend.scale(scaleFactor)
+            self.draw(colorOverrides=colorOverrides)
+            backend.restore()
+            return
+
+        im, (xMin, yMin) = self.getThumbnail(scaleFactor, colorOverrides)
+        backend.save()
+        backend.translate(x + xMin * scaleFactor, y + yMin * scaleFactor)
+        backend.scale(1.0 / self.thumbnailsResolution)
+        backend.image(im, (0, 0))
+        backend.restore()
+
+    def updateIndex(self):
+        '''
+        Update the spatial index of objects and connections used for hit-testing.
+
+        When new positions have been calculated, only objects which have moved or changed size
+        are indexed again, together with their connections. The index is rebuilt if the connections
+        or the width of the lines have changed.
+
+        '''
+        # compare the contents, so connections changed in place are noticed too
+        connectionsKey = tuple(tuple(connection) for connection in self.connections), self.linesStrokeWidth
+        if getattr(self, '_index', None) is None or self._indexConnectionsKey != connectionsKey:
+            self._index = SpatialGrid(max(self.radius1, self.radius2) * 2)
+            self._indexedObjects = {}
+            self._indexedPositions = None
+            self._indexConnectionsKey = connectionsKey
+            self._objectConnections = {}
+            for obj1, obj2 in self.connections:
+                self._objectConnections.setdefault(obj1, []).append((obj1, obj2))
+                self._objectConnections.setdefault(obj2, []).append((obj1, obj2))
+
+        if self._indexedPositions is self.positions:
+            return
+
+        for obj in list(self._indexedObjects):
+            if obj not in self.positions:
+                self._index.remove(('object', obj))
+                del self._indexedObjects[obj]
+                self.indexConnections(obj)
+
+        for i, obj in enumerate(self.positions):
+            self.indexObject(obj, i)
+
+        self._indexedPositions = self.positions
+
+    def indexObject(self, obj, order):
+        x, y = self.positions[obj]
+        r = self.getRadius(obj)
+        if self._indexedObjects.get(obj) == (x, y, r, order):
+            return
+        self._index.insert(('object', obj), (x - r, y - r, x + r, y + r))
+        self._indexedObjects[obj] = x, y, r, order
+        self.indexConnections(obj)
+
+    def indexConnections(self, obj):
+        w = self.linesStrokeWidth * 0.5
+        for obj1, obj2 in self._objectConnections.get(obj, []):
+            key = 'connection', obj1, obj2
+            if obj1 in self.positions and obj2 in self.positions:
+                (x1, y1), (x2, y2) = self.positions[obj1], self.positions[obj2]
+                self._index.insert(key, (min(x1, x2) - w, min(y1, y2) - w, max(x1, x2) + w, max(y1, y2) + w))
+            elif key in self._index:
+                self._index.remove(key)
+
+    def moveObject(self, obj, pos):
+        '''
+        Move an object to a new position, updating the spatial index and the cached display list incrementally.
+
+        '''
+        self.updateIndex()
+        self.positions[obj] = pos
+        order = self._indexedObjects[obj][3] if obj in self._indexedObjects else len(self._indexedObjects)
+        self.indexObject(obj, order)
+
+        # cached symbols and thumbnails are made from the old positions
+        self._movedCount = getattr(self, '_movedCount', 0) + 1
+
+        # compiling the whole map would calculate the positions again, so only the moved object is compiled
+        if getattr(self, '_displayParameters', None) is not None and self.positions is self._displayPositions:
+            self._displayList = self.recompileObjects(set([obj]))
+
+    def objectAt(self, pos):
+        '''
+        Get the object whose circle contains a given point, or `None`.
+        If circles overlap, the one drawn on top is returned.
+
+        '''
+        self.updateIndex()
+        x, y = pos
+        found = None
+        for key in self._index.query((x, y, x, y)):
+            if key[0] != 'object':
+                continue
+            x0, y0, r, order = self._indexedObjects[key[1]]
+            if math.hypot(x - x0, y - y0) <= r and (found is None or order > found[0]):
+                found = order, key[1]
+        return found[1] if found else None
+
+    def connectionAt(self, pos, tolerance=None):
+        '''
+        Get the connection line closest to a given point, or `None`.
+        By default, the point must be on the stroke of the line.
+
+        '''
+        self.updateIndex()
+        if tolerance is None:
+            tolerance = self.linesStrokeWidth * 0.5
+        x, y = pos
+        found = None
+        foundDistance = None
+        for key in self._index.query((x - tolerance, y - tolerance, x + tolerance, y + tolerance)):
+            if key[0] != 'connection':
+                continue
+            obj1, obj2 = key[1:]
+            distance = distanceToSegment(pos, self.positions[obj1], self.positions[obj2])
+            if distance <= tolerance and (found is None or distance < foundDistance):
+                found = obj1, obj2
+                foundDistance = distance
+        return found
+
+    def objectsInRect(self, box):
+        '''
+        Get all objects whose circles intersect a rectangle `(x, y, w, h)`.
+
+        '''
+        self.updateIndex()
+        x, y, w, h = box
+        xMin, yMin, xMax, yMax = min(x, x + w), min(y, y + h), max(x, x + w), max(y, y + h)
+        objects = []
+        for key in self._index.query((xMin, yMin, xMax, yMax)):
+            if key[0] != 'object':
+                continue
+            x0, y0, r, order = self._indexedObjects[key[1]]
+            # closest point of the rectangle to the circle center
+            cx = max(xMin, min(x0, xMax))
+            cy = max(yMin, min(y0, yMax))
+            if math.hypot(cx - x0, cy - y0) <= r:
+                objects.append((order, key[1]))
+        return [obj for order, obj in sorted(objects)]
+
+    def drawFrame(self, offsets, pageSize=(600, 400), scaleFactor=0.63, origin=(285, 373), duration=0.05):
+        '''
+        Draw one animation frame on a new page.
+
+        '''
+        drawBot.newPage(*pageSize)
+        drawBot.fill(1)
+        drawBot.rect(0, 0, drawBot.width(), drawBot.height())
+        drawBot.frameDuration(duration)
+        drawBot.scale(scaleFactor)
+        drawBot.translate(*origin)
+        self.draw(offsets=offsets)
+
+    def saveAnimation(self, path, frames=20, seed=0, processes=None, folder=None, **frameSettings):
+        '''
+        Save an animation of the map with randomized positions.
+
+        Offsets for all frames are calculated up front from the given seed,
+        and frames are rendered to PNG images in parallel worker processes.
+        The same seed always gives the same frames.
+
+        Frame images are saved to `folder` if given, otherwise to a temporary folder which is removed afterwards.
+        With `processes=1` all frames are rendered in the current process.
+
+        '''
+        jitter = self.makeJitter(frames, seed)
+
+        keepFrames = folder is not None
+        if folder is None:
+            folder = tempfile.mkdtemp()
+        elif not os.path.exists(folder):
+            os.makedirs(folder)
+
+        jobs = []
+        for i, offsets in enumerate(jitter):
+            framePath = os.path.join(folder, 'frame_%04d.png' % i)
+            jobs.append((self, offsets, frameSettings, framePath))
+
+        if processes == 1:
+            framePaths = [renderAnimationFrame(job) for job in jobs]
+        else:
+            with multiprocessing.Pool(processes) as pool:
+                framePaths = pool.map(renderAnimationFrame, jobs)
+
+        # merge frames in order
+        duration = frameSettings.get('duration', 0.05)
+        drawBot.newDrawing()
+        for framePath in framePaths:
+            w, h = drawBot.imageSize(framePath)
+            drawBot.newPage(w, h)
+            drawBot.frameDuration(duration)
+            drawBot.image(framePath, (0, 0))
+        drawBot.saveImage(path)
+        drawBot.endDrawing()
+
+        if not keepFrames:
+            shutil.rmtree(folder)
+
+def renderAnimationFrame(job):
+    '''
+    Render a single animation frame to an image file.
+
+    '''
+    mapMaker, offsets, frameSettings, framePath = job
+    drawBot.newDrawing()
+    mapMaker.drawFrame(offsets, **frameSettings)
+    drawBot.saveImage(framePath)
+    drawBot.endDrawing()
+    return framePath
 
 class FontPartsMapUI:
 
+    '''
+    Sliders for tweaking the map geometry interactively.
+
+    The map is kept between runs of the script, so that only the parts of the map
+    which depend on the changed sliders are calculated again.
+
+    '''
+
+    # map attributes controlled by sliders
+    sliders = [
+        'radius1', 'radius2', 'length1', 'length2',
+        'angle1', 'angleStart1', 'angle2', 'angleStart2', 'angle3', 'angleStart3',
+    ]
+
+    mapMaker = None
+
     def __init__(self):
 
-        M = FontPartsMap()
-
-        Variable([
-            dict(name="x",           ui="Slider", args=dict(value=300, minValue=0,  maxValue=1000)),
-            dict(name="y",           ui="Slider", args=dict(value=400, minValue=0,  maxValue=1000)),
-            dict(name="radius1",     ui="Slider", args=dict(value=M.radius1,     minValue=M.radius1*0.5,     maxValue=M.radius1*1.5)),
-            dict(name="radius2",     ui="Slider", args=dict(value=M.radius2,     minValue=M.radius2*0.5,     maxValue=M.radius2*1.5)),
-            dict(name="length1",     ui="Slider", args=dict(value=M.length1,     minValue=M.length1*0.5,     maxValue=M.length1*1.5)),
-            dict(name="length2",     ui="Slider", args=dict(value=M.length2,     minValue=M.length2*0.5,     maxValue=M.length2*1.5)),
-            dict(name="angle1",      ui="Slider", args=dict(value=M.angle1,      minValue=M.angle1*0.5,      maxValue=M.angle1*1.5)),
-            dict(name="angleStart1", ui="Slider", args=dict(value=M.angleStart1, minValue=M.angleStart1*0.5, maxValue=M.angleStart1*1.5)),
-            dict(name="angle2",      ui="Slider", args=dict(value=M.angle2,      minValue=M.angle2*0.5,      maxValue=M.angle2*1.5)),
-            dict(name="angleStart2", ui="Slider", args=dict(value=M.angleStart2, minValue=M.angleStart2*0.5, maxValue=M.angleStart2*1.5)),
-            dict(name="angle3",      ui="Slider", args=dict(value=M.angle3,      minValue=M.angle3*0.5,      maxValue=M.angle3*1.5)),
-            dict(name="angleStart3", ui="Slider", args=dict(value=M.angleStart3, minValue=M.angleStart3*0.5, maxValue=M.angleStart3*1.5)),
-            dict(name="randomness",  ui="Slider", args=dict(value=M.randomness,  minValue=0, maxValue=10)),
-        ], globals())
-
-        M.radius1 = radius1
-        M.radius2 = radius2
-        M.length1 = length1
-        M.length2 = length2
-        M.length3 = length3
-
-        M.angle1 = angle1
-        M.angle2 = angle2
-        M.angle3 = angle3
-
-        M.angleStart1 = angleStart1
-        M.angleStart2 = angleStart2
-        M.angleStart3 = angleStart3
-
-        M.randomness = int(randomness)
-
-        M.draw((x, y))
+        if FontPartsMapUI.mapMaker is None:
+            FontPartsMapUI.mapMaker = FontPartsMap()
+        M = FontPartsMapUI.mapMaker
+        defaults = FontPartsMap()
+
+        variables = [
+            dict(name="x", ui="Slider", args=dict(value=300, minValue=0, maxValue=1000)),
+            dict(name="y", ui="Slider", args=dict(value=400, minValue=0, maxValue=1000)),
+        ]
+        for attr in self.sliders:
+            value = getattr(defaults, attr)
+            variables.append(dict(name=attr, ui="Slider", args=dict(value=value, minValue=value*0.5, maxValue=value*1.5)))
+        variables.append(dict(name="randomness", ui="Slider", args=dict(value=defaults.randomness, minValue=0, maxValue=10)))
+
+        values = {}
+        drawBot.Variable(variables, values)
+
+        for attr in self.sliders:
+            setattr(M, attr, values[attr])
+        M.randomness = int(values['randomness'])
+
+        M.draw((values['x'], values['y']))
 
 class FontPartsMap(FontPartsMapMaker):
     
@@ -438,8 +1382,8 @@ class FontPartsMap(FontPartsMapMaker):
 
 if __name__ == '__main__':
 
-    size(1000, 700)
-    translate(300, 410)
+    drawBot.size(1000, 700)
+    drawBot.translate(300, 410)
     M = FontPartsMap()
     M.draw()
 
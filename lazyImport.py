@@ -0,0 +1,45 @@
+'''
+Deferred imports
+
+Rendering libraries like drawBot take a long time to import. Modules which only
+use them for drawing can refer to them through a `LazyModule`, which imports the
+real module the first time one of its attributes is used.
+
+'''
+
+import importlib
+
+
+class LazyModule:
+
+    '''
+    A stand-in for a module which is imported on first attribute access.
+
+    '''
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def load(self):
+        '''
+        Import the module (if needed) and return it.
+
+        '''
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        # only called for attributes which are not found on the stand-in itself
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f'<LazyModule {self._name} ({state})>'
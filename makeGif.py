@@ -1,15 +1,7 @@
 from fontPartsMap import FontPartsMap
 
-M = FontPartsMap()
-M.randomness = 10
+if __name__ == '__main__':
 
-for i in range(20):
-    newPage(600, 400)
-    fill(1)
-    rect(0, 0, width(), height())
-    frameDuration(0.05)
-    scale(0.63)
-    translate(285, 373)
-    M.draw()
-
-saveImage('fontPartsMap.gif')
+    M = FontPartsMap()
+    M.randomness = 10
+    M.saveAnimation('fontPartsMap.gif', frames=20, seed=0)
@@ -0,0 +1,280 @@
+'''
+Tree layouts for object maps
+
+Positions are calculated in linear time for any graph given as a list of (parent, child) connections.
+
+'''
+
+import math
+
+
+class TreeLayout:
+
+    '''
+    Radial and tidy tree layouts for a graph of connections.
+
+    The first connection to a node defines its parent; any further connections to it
+    are drawn as lines but are ignored by the layout. Nodes without a parent are roots.
+
+    '''
+
+    def __init__(self, connections):
+        self.children = {}
+        self.parents = {}
+        for parent, child in connections:
+            self.children.setdefault(parent, [])
+            self.children.setdefault(child, [])
+            if child not in self.parents and child != parent:
+                self.parents[child] = parent
+                self.children[parent].append(child)
+
+        self.roots = [node for node in self.children if node not in self.parents]
+
+        # breadth-first order and depth of all nodes
+        self.nodes = []
+        self.depths = {}
+        for root in self.roots:
+            self.walk(root)
+
+        # nodes which can't be reached from a root are part of a cycle:
+        # detach them from their parent and make them roots too
+        for node in self.children:
+            if node not in self.depths:
+                parent = self.parents.pop(node)
+                self.children[parent].remove(node)
+                self.roots.append(node)
+                self.walk(node)
+
+        # number of leaves in each subtree, counted bottom-up
+        self.leaves = {}
+        for node in reversed(self.nodes):
+            children = self.children[node]
+            self.leaves[node] = sum(self.leaves[child] for child in children) if children else 1
+
+    def walk(self, root):
+        self.depths[root] = 0
+        queue = [root]
+        i = 0
+        while i < len(queue):
+            node = queue[i]
+            i += 1
+            for child in self.children[node]:
+                self.depths[child] = self.depths[node] + 1
+                queue.append(child)
+        self.nodes += queue
+
+    def radial(self, center=(0, 0), levelDistance=200, angleStart=0, angleEnd=360):
+        '''
+        Place nodes on concentric circles around the center, one circle per tree level.
+
+        Each node gets an angular wedge proportional to the number of leaves below it,
+        and its children are spread inside that wedge.
+        A single root is placed at the center. Several roots are spread on the first circle,
+        as if they were the children of one root at the center.
+
+        '''
+        cx, cy = center
+        depthOffset = 1 if len(self.roots) > 1 else 0
+        total = sum(self.leaves[root] for root in self.roots)
+        wedges = {}
+        a = angleStart
+        for root in self.roots:
+            a2 = a + (angleEnd - angleStart) * self.leaves[root] / total
+            wedges[root] = a, a2
+            a = a2
+
+        positions = {}
+        for node in self.nodes:
+            a1, a2 = wedges[node]
+            r = (self.depths[node] + depthOffset) * levelDistance
+            angle = math.radians((a1 + a2) * 0.5)
+            positions[node] = cx + math.cos(angle) * r, cy + math.sin(angle) * r
+
+            # split the wedge between children
+            children = self.children[node]
+            if children:
+                step = (a2 - a1) / self.leaves[node]
+                a = a1
+                for child in children:
+                    wedges[child] = a, a + step * self.leaves[child]
+                    a += step * self.leaves[child]
+
+        return positions
+
+    def tidy(self, origin=(0, 0), levelDistance=200, siblingDistance=150):
+        '''
+        Place nodes in horizontal rows, one row per tree level, going down from the origin.
+
+        Leaves are spaced evenly from left to right, and each parent is centered above its children.
+
+        '''
+        x0, y0 = origin
+
+        # horizontal positions of leaves, in depth-first order
+        xs = {}
+        n = 0
+        stack = list(reversed(self.roots))
+        while stack:
+            node = stack.pop()
+            children = self.children[node]
+            if children:
+                stack += reversed(children)
+            else:
+                xs[node] = n * siblingDistance
+                n += 1
+
+        # center parents above their children, bottom-up
+        for node in reversed(self.nodes):
+            children = self.children[node]
+            if children:
+                xs[node] = (xs[children[0]] + xs[children[-1]]) * 0.5
+
+        positions = {}
+        for node in self.nodes:
+            positions[node] = x0 + xs[node], y0 - self.depths[node] * levelDistance
+        return positions
+
+
+class SpatialGrid:
+
+    '''
+    A uniform grid of bounding boxes for fast neighbour queries.
+
+    Each item is stored in every cell its box touches, so a query only
+    looks at the items in the cells around the query box instead of all items.
+
+    '''
+
+    def __init__(self, cellSize):
+        self.cellSize = cellSize
+        self.cells = {}
+        self.boxes = {}
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __contains__(self, key):
+        return key in self.boxes
+
+    def getCells(self, box):
+        xMin, yMin, xMax, yMax = box
+        s = self.cellSize
+        for i in range(int(math.floor(xMin / s)), int(math.floor(xMax / s)) + 1):
+            for j in range(int(math.floor(yMin / s)), int(math.floor(yMax / s)) + 1):
+                yield i, j
+
+    def insert(self, key, box):
+        '''
+        Add an item with a bounding box `(xMin, yMin, xMax, yMax)`.
+
+        '''
+        if key in self.boxes:
+            self.remove(key)
+        self.boxes[key] = box
+        for cell in self.getCells(box):
+            self.cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key):
+        box = self.boxes.pop(key)
+        for cell in self.getCells(box):
+            items = self.cells[cell]
+            items.discard(key)
+            if not items:
+                del self.cells[cell]
+
+    def query(self, box):
+        '''
+        Get all items whose bounding boxes intersect a given box.
+
+        '''
+        xMin, yMin, xMax, yMax = box
+        found = set()
+        for cell in self.getCells(box):
+            for key in self.cells.get(cell, ()):
+                if key in found:
+                    continue
+                x0, y0, x1, y1 = self.boxes[key]
+                if x0 <= xMax and x1 >= xMin and y0 <= yMax and y1 >= yMin:
+                    found.add(key)
+        return found
+
+
+def resolveOverlaps(positions, radii, padding=0, iterations=20, fixed=()):
+    '''
+    Move overlapping circles apart.
+
+    Overlapping pairs are found with a spatial grid, and each pair is pushed apart along
+    the line between their centers. This is repeated until no circles overlap,
+    or until the maximum number of iterations is reached.
+
+    Circles in `fixed` are not moved. Returns a new dict of positions.
+
+    '''
+    positions = dict(positions)
+    if not positions:
+        return positions
+
+    order = {obj: i for i, obj in enumerate(positions)}
+    cellSize = (max(radii[obj] for obj in positions) + padding) * 2
+
+    for iteration in range(iterations):
+        grid = SpatialGrid(cellSize)
+        for obj, (x, y) in positions.items():
+            r = radii[obj] + padding
+            grid.insert(obj, (x - r, y - r, x + r, y + r))
+
+        moved = False
+        for obj in positions:
+            x, y = positions[obj]
+            r = radii[obj] + padding
+            for other in grid.query((x - r, y - r, x + r, y + r)):
+                # look at each pair only once
+                if order[other] <= order[obj]:
+                    continue
+                x1, y1 = positions[obj]
+                x2, y2 = positions[other]
+                minDistance = radii[obj] + radii[other] + padding * 2
+                dx, dy = x2 - x1, y2 - y1
+                distance = math.hypot(dx, dy)
+                if distance >= minDistance:
+                    continue
+
+                # circles on top of each other: separate them in a repeatable direction
+                if distance == 0:
+                    angle = order[other] * 2.399963
+                    dx, dy, distance = math.cos(angle), math.sin(angle), 1.0
+
+                overlap = minDistance - distance
+                ux, uy = dx / distance, dy / distance
+                if obj in fixed and other in fixed:
+                    continue
+                elif obj in fixed:
+                    move1, move2 = 0, overlap
+                elif other in fixed:
+                    move1, move2 = overlap, 0
+                else:
+                    move1 = move2 = overlap * 0.5
+                positions[obj] = x1 - ux * move1, y1 - uy * move1
+                positions[other] = x2 + ux * move2, y2 + uy * move2
+                moved = True
+
+        if not moved:
+            break
+
+    return positions
+
+
+def distanceToSegment(pt, pt1, pt2):
+    '''
+    Get the distance from a point to a line segment.
+
+    '''
+    x, y = pt
+    x1, y1 = pt1
+    x2, y2 = pt2
+    dx, dy = x2 - x1, y2 - y1
+    lengthSquared = dx * dx + dy * dy
+    if lengthSquared == 0:
+        return math.hypot(x - x1, y - y1)
+    t = max(0, min(1, ((x - x1) * dx + (y - y1) * dy) / lengthSquared))
+    return math.hypot(x - (x1 + t * dx), y - (y1 + t * dy))
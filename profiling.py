@@ -0,0 +1,214 @@
+'''
+Opt-in timing of drawing phases
+
+A profiler records wall time, number of calls and counters (interpolations, drawing primitives, etc.)
+for each phase of a drawing, and can export them as JSON or in Chrome trace format.
+
+Objects use `nullProfiler` by default, which does nothing, so instrumented code
+runs at practically full speed unless a `Profiler` is set.
+
+'''
+
+import os
+import json
+import time
+
+
+# drawing functions which are counted as primitives
+drawingPrimitives = ['oval', 'rect', 'line', 'polygon', 'drawPath', 'text', 'textBox', 'image']
+
+
+class ProfilerPhase:
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.begin(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.end()
+
+
+class CallCounter:
+
+    '''
+    Temporarily replace functions in a namespace with wrappers which count their calls.
+    The namespace is a dict (a module's `vars()`), or an object like a render backend.
+
+    '''
+
+    def __init__(self, profiler, namespace, names):
+        self.profiler = profiler
+        self.namespace = namespace
+        if isinstance(namespace, dict):
+            self.names = [name for name in names if name in namespace]
+        else:
+            self.names = [name for name in names if hasattr(namespace, name)]
+        self.originals = {}
+
+    def wrap(self, name, func):
+        profiler = self.profiler
+        def wrapper(*args, **kwargs):
+            profiler.count('primitives')
+            profiler.count(name)
+            return func(*args, **kwargs)
+        return wrapper
+
+    def __enter__(self):
+        if isinstance(self.namespace, dict):
+            namespace = self.namespace
+        else:
+            # wrappers are set on the object itself, and removed again afterwards
+            namespace = vars(self.namespace)
+            self.instanceAttributes = {name: namespace[name] for name in self.names if name in namespace}
+        for name in self.names:
+            self.originals[name] = namespace[name] if namespace is self.namespace else getattr(self.namespace, name)
+            namespace[name] = self.wrap(name, self.originals[name])
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if isinstance(self.namespace, dict):
+            self.namespace.update(self.originals)
+        else:
+            namespace = vars(self.namespace)
+            for name in self.names:
+                if name in self.instanceAttributes:
+                    namespace[name] = self.instanceAttributes[name]
+                else:
+                    del namespace[name]
+        self.originals = {}
+
+
+class Profiler:
+
+    '''
+    Record wall time, calls and counters of nested drawing phases.
+
+    Phases are named by their path, for example `logotype.draw/glyph`.
+    Counters are added to the innermost active phase.
+
+    '''
+
+    enabled = True
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.events = []
+        self.stats = {}
+        self._stack = []
+        self._start = time.perf_counter()
+
+    def phase(self, name):
+        return ProfilerPhase(self, name)
+
+    def countCalls(self, namespace, names=drawingPrimitives):
+        '''
+        Count calls to drawing functions in a namespace (a module's `vars()` or a render backend) while the context is active.
+
+        '''
+        return CallCounter(self, namespace, names)
+
+    def begin(self, name):
+        path = self._stack[-1][0] + '/' + name if self._stack else name
+        self._stack.append((path, time.perf_counter(), {}))
+
+    def end(self):
+        path, start, counters = self._stack.pop()
+        duration = time.perf_counter() - start
+
+        stats = self.stats.setdefault(path, {'calls': 0, 'time': 0.0, 'counters': {}})
+        stats['calls'] += 1
+        stats['time'] += duration
+        for counter, value in counters.items():
+            stats['counters'][counter] = stats['counters'].get(counter, 0) + value
+
+        self.events.append((path, start - self._start, duration, counters))
+
+    def count(self, counter, value=1):
+        if self._stack:
+            counters = self._stack[-1][2]
+            counters[counter] = counters.get(counter, 0) + value
+
+    def asDict(self):
+        '''
+        Get the totals of all phases.
+
+        '''
+        return {path: dict(stats, counters=dict(stats['counters'])) for path, stats in self.stats.items()}
+
+    def saveJSON(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.asDict(), f, indent=2)
+
+    def asChromeTrace(self):
+        '''
+        Get all recorded phases as a Chrome trace, which can be opened in `chrome://tracing` or Perfetto.
+
+        '''
+        pid = os.getpid()
+        traceEvents = []
+        for path, start, duration, counters in self.events:
+            traceEvents.append({
+                'name' : path.split('/')[-1],
+                'cat'  : path.split('/')[0],
+                'ph'   : 'X',
+                'ts'   : start * 1e6,
+                'dur'  : duration * 1e6,
+                'pid'  : pid,
+                'tid'  : 0,
+                'args' : dict(counters, path=path),
+            })
+        return {'traceEvents': traceEvents, 'displayTimeUnit': 'ms'}
+
+    def saveChromeTrace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.asChromeTrace(), f)
+
+    def report(self):
+        '''
+        Get a text table of all phases, slowest first.
+
+        '''
+        lines = []
+        for path, stats in sorted(self.stats.items(), key=lambda item: -item[1]['time']):
+            counters = ', '.join(f'{counter} {value}' for counter, value in sorted(stats['counters'].items()))
+            lines.append(f"{path:40} {stats['calls']:6} {stats['time'] * 1000:10.3f} ms  {counters}")
+        return '\n'.join(lines)
+
+
+class NullPhase:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+class NullProfiler:
+
+    '''
+    A profiler which records nothing.
+
+    '''
+
+    enabled = False
+
+    _phase = NullPhase()
+
+    def phase(self, name):
+        return self._phase
+
+    def countCalls(self, namespace, names=drawingPrimitives):
+        return self._phase
+
+    def count(self, counter, value=1):
+        pass
+
+
+nullProfiler = NullProfiler()
@@ -0,0 +1,705 @@
+'''
+Render backends
+
+The map and the logotype draw through a backend object instead of calling drawBot directly.
+A backend provides the drawing primitives used by them:
+
+    save, restore, translate, scale
+    fill, stroke, strokeWidth, lineDash, lineCap, font, fontSize, shadow, linearGradient
+    oval, rect, line, text, textBox, drawPath, BezierPath
+
+`DrawBotBackend` draws with drawBot, and is the default. `SVGBackend` writes SVG
+to a file as it is drawn, without drawBot, so headless renders start fast and use little memory.
+
+'''
+
+import math
+from collections import OrderedDict
+from lazyImport import LazyModule
+
+
+class DrawBotBackend(LazyModule):
+
+    '''
+    Draw with drawBot. All drawBot functions are available on the backend,
+    and drawBot is only imported when the first one is used.
+
+    '''
+
+    # rendered images (sprites and thumbnails) can be drawn
+    imageObjects = True
+
+    # drawings are not reused as symbols
+    symbols = False
+
+    def __init__(self):
+        super().__init__('drawBot')
+
+    def __getattr__(self, attr):
+        value = super().__getattr__(attr)
+        # keep the function on the backend, so it is looked up directly next time
+        setattr(self, attr, value)
+        return value
+
+    def __reduce__(self):
+        # pickle as a reference to the shared backend, for sending maps to worker processes
+        return 'drawBotBackend'
+
+
+drawBotBackend = DrawBotBackend()
+
+
+def drawSymbol(backend, key, drawFunc):
+    '''
+    Draw something with `drawFunc`. On backends which support symbols, a drawing with the same key
+    is only written once, and reused afterwards.
+
+    '''
+    if not backend.symbols:
+        drawFunc()
+    elif not backend.useSymbol(key):
+        backend.beginSymbol(key)
+        drawFunc()
+        backend.endSymbol()
+
+
+def formatNumber(value, precision=2):
+    txt = f'{value:.{precision}f}'.rstrip('0').rstrip('.')
+    return '0' if txt == '-0' else txt
+
+def escapeText(txt):
+    return txt.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+def makeColor(args):
+    '''
+    Convert drawBot color arguments (gray, gray alpha, r g b or r g b alpha) to an SVG color and an opacity.
+    Returns `None` for no color.
+
+    '''
+    if not args or args[0] is None:
+        return None
+    if len(args) <= 2:
+        r = g = b = args[0]
+        alpha = args[1] if len(args) == 2 else 1
+    else:
+        r, g, b = args[:3]
+        alpha = args[3] if len(args) == 4 else 1
+    channels = [max(0, min(255, int(round(value * 255)))) for value in (r, g, b)]
+    return '#%02x%02x%02x' % tuple(channels), alpha
+
+
+class SVGPath:
+
+    '''
+    A path which records its outline as SVG path data, with the pen methods and shapes of a drawBot `BezierPath`.
+
+    '''
+
+    def __init__(self, precision=2):
+        self.precision = precision
+        self.commands = []
+        self.onCurvePoints = []
+        self.lines = []
+        self.curves = False
+        self._current = None
+        self._start = None
+
+    def _point(self, pt):
+        x, y = pt
+        return f'{formatNumber(x, self.precision)} {formatNumber(y, self.precision)}'
+
+    @property
+    def d(self):
+        return ' '.join(self.commands)
+
+    # pen protocol
+
+    def moveTo(self, pt):
+        self.commands.append('M' + self._point(pt))
+        self.onCurvePoints.append(tuple(pt))
+        self._current = self._start = tuple(pt)
+
+    def lineTo(self, pt):
+        self.commands.append('L' + self._point(pt))
+        self.onCurvePoints.append(tuple(pt))
+        self.lines.append((self._current, tuple(pt)))
+        self._current = tuple(pt)
+
+    def curveTo(self, *points):
+        if len(points) > 3:
+            from fontTools.pens.basePen import decomposeSuperBezierSegment
+            for segment in decomposeSuperBezierSegment(points):
+                self.curveTo(*segment)
+            return
+        if len(points) == 2:
+            # a cubic with one off-curve point is a quadratic
+            self.qCurveTo(*points)
+            return
+        self.commands.append('C' + ' '.join(self._point(pt) for pt in points))
+        self.onCurvePoints.append(tuple(points[-1]))
+        self.curves = True
+        self._current = tuple(points[-1])
+
+    def qCurveTo(self, *points):
+        if points[-1] is None:
+            # a contour without on-curve points starts between the last and first off-curve points
+            (x1, y1), (x2, y2) = points[-2], points[0]
+            self.moveTo(((x1 + x2) * 0.5, (y1 + y2) * 0.5))
+            points = points[:-1] + (self._start,)
+        offCurves, end = points[:-1], points[-1]
+        for i, (x, y) in enumerate(offCurves):
+            if i < len(offCurves) - 1:
+                nx, ny = offCurves[i + 1]
+                pt = (x + nx) * 0.5, (y + ny) * 0.5
+            else:
+                pt = end
+            self.commands.append('Q' + self._point((x, y)) + ' ' + self._point(pt))
+        self.onCurvePoints.append(tuple(end))
+        self.curves = True
+        self._current = tuple(end)
+
+    def closePath(self):
+        self.commands.append('Z')
+        self._current = self._start
+
+    def endPath(self):
+        pass
+
+    def addComponent(self, glyphName, transformation):
+        # like a drawBot path without a glyph set, components are skipped
+        pass
+
+    # shapes
+
+    def rect(self, x, y, w, h):
+        self.moveTo((x, y))
+        self.lineTo((x + w, y))
+        self.lineTo((x + w, y + h))
+        self.lineTo((x, y + h))
+        self.closePath()
+
+    def oval(self, x, y, w, h):
+        rx, ry = w * 0.5, h * 0.5
+        cx, cy = x + rx, y + ry
+        arc = f'A{formatNumber(rx, self.precision)} {formatNumber(ry, self.precision)} 0 1 0 '
+        self.moveTo((cx + rx, cy))
+        self.commands.append(arc + self._point((cx - rx, cy)))
+        self.commands.append(arc + self._point((cx + rx, cy)))
+        self.closePath()
+        self.curves = True
+
+    def expandStroke(self, width, lineCap='round'):
+        '''
+        Get the outline of the path stroked with a given width and round caps.
+        Only paths made of straight lines can be expanded.
+
+        '''
+        if self.curves or lineCap != 'round':
+            raise NotImplementedError('only straight lines with round caps can be expanded')
+        r = width * 0.5
+        outline = SVGPath(self.precision)
+        arc = f'A{formatNumber(r, self.precision)} {formatNumber(r, self.precision)} 0 0 1 '
+        for (x1, y1), (x2, y2) in self.lines:
+            a = math.atan2(y2 - y1, x2 - x1)
+            dx, dy = -math.sin(a) * r, math.cos(a) * r
+            outline.moveTo((x1 - dx, y1 - dy))
+            outline.lineTo((x2 - dx, y2 - dy))
+            outline.commands.append(arc + outline._point((x2 + dx, y2 + dy)))
+            outline.lineTo((x1 + dx, y1 + dy))
+            outline.commands.append(arc + outline._point((x1 - dx, y1 - dy)))
+            outline.closePath()
+        outline.curves = True
+        return outline
+
+
+class SVGState:
+
+    '''
+    The graphics state of an SVG backend.
+
+    '''
+
+    def __init__(self):
+        self.fill = ('#000000', 1)
+        self.stroke = None
+        self.strokeWidth = 1
+        self.lineDash = None
+        self.lineCap = None
+        self.font = None
+        self.fontSize = 10
+        self.shadow = None
+        self.gradient = None
+        # transformation relative to the page, and the number of open groups
+        self.transform = (1, 0, 0, 1, 0, 0)
+        self.groups = 0
+
+    def copy(self):
+        state = SVGState.__new__(SVGState)
+        state.__dict__.update(self.__dict__)
+        return state
+
+
+class SVGBackend:
+
+    '''
+    Write drawings as SVG to a file or stream, element by element as they are drawn.
+
+    Only the graphics state and a bounded number of definitions (shadow filters, gradients and symbols) are kept in memory.
+    Paths longer than `symbolsMinLength` are written once and reused when the same outline is drawn again,
+    like the same glyph in different layers. Whole drawings can be reused with `drawSymbol`.
+    Like in drawBot, the origin is at the bottom left of the page.
+    Text is set on one line without a layout engine, so text boxes don't wrap.
+
+        backend = SVGBackend('map.svg')
+        backend.newPage(1000, 700)
+        M.backend = backend
+        M.draw((300, 410))
+        backend.endDrawing()
+
+    '''
+
+    # rendered images (sprites and thumbnails) can't be drawn
+    imageObjects = False
+
+    # identical paths and drawings are written once and reused with `<use>`
+    symbols = True
+
+    # maximum number of remembered symbols
+    symbolsCacheSize = 4096
+
+    # shorter paths are always written out
+    symbolsMinLength = 64
+
+    BezierPath = SVGPath
+
+    # maximum number of remembered gradient and shadow definitions
+    definitionsCacheSize = 1024
+
+    # room for the size of a document with many pages
+    headerPadding = 48
+
+    def __init__(self, output, width=None, height=None, precision=2):
+        if isinstance(output, str):
+            self.stream = open(output, 'w', encoding='utf-8')
+            self.ownsStream = True
+        else:
+            self.stream = output
+            self.ownsStream = False
+        self.write = self.stream.write
+        self.precision = precision
+        self.pageSize = None
+        self.documentSize = 0, 0
+        self.headerLength = 0
+        self.state = SVGState()
+        self.stack = []
+        self.definitions = {}
+        self.definitionsCount = 0
+        self.symbolIds = OrderedDict()
+        self.symbolStack = []
+        self._styles = {}
+        if width is not None:
+            self.newPage(width, height)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.endDrawing()
+
+    def _number(self, value):
+        return formatNumber(value, self.precision)
+
+    # --------
+    # document
+    # --------
+
+    def _header(self, width, height):
+        w, h = self._number(width), self._number(height)
+        return f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" width="{w}" height="{h}" viewBox="0 0 {w} {h}">\n'
+
+    def newPage(self, width, height):
+        '''
+        Start a new page. Pages are placed below each other in one document,
+        so that symbols can be reused on all pages.
+
+        '''
+        if self.pageSize is None:
+            header = self._header(width, height)
+            if self.stream.seekable():
+                # leave room to write the size of the whole document at the end
+                header += '<!--' + ' ' * self.headerPadding + '-->\n'
+            self.write(header)
+            self.headerLength = len(header)
+        else:
+            if not self.stream.seekable():
+                raise ValueError('documents with more than one page need a seekable output')
+            self._endPage()
+
+        self.pageSize = width, height
+        self.state = SVGState()
+        self.stack = []
+        self._styles = {}
+        w, h = self._number(width), self._number(height)
+        self.write(f'<svg x="0" y="{self._number(self.documentSize[1])}" width="{w}" height="{h}" viewBox="0 0 {w} {h}">\n')
+        # flip the y axis, so that the origin is at the bottom left
+        self.write(f'<g transform="matrix(1 0 0 -1 0 {h})">\n')
+        self.documentSize = max(self.documentSize[0], width), self.documentSize[1] + height
+
+    size = newPage
+
+    def _endPage(self):
+        self.write('</g>\n' * self.state.groups)
+        self.write('</g>\n</svg>\n')
+
+    def width(self):
+        return self.pageSize[0]
+
+    def height(self):
+        return self.pageSize[1]
+
+    def endDrawing(self):
+        '''
+        Close all open groups and the document, and close the output file.
+
+        '''
+        if self.stream is None:
+            return
+        if self.pageSize is not None:
+            self._endPage()
+            self.write('</svg>\n')
+            if self.documentSize != self.pageSize:
+                # write the size of all pages over the header of the first page
+                header = self._header(*self.documentSize)
+                header += '<!--' + ' ' * (self.headerLength - len(header) - 8) + '-->\n'
+                self.stream.seek(0)
+                self.write(header)
+                self.stream.seek(0, 2)
+        if self.ownsStream:
+            self.stream.close()
+        else:
+            self.stream.flush()
+        self.stream = None
+
+    close = endDrawing
+
+    # ---------------
+    # graphics state
+    # ---------------
+
+    def save(self):
+        self.stack.append(self.state.copy())
+
+    def restore(self):
+        state = self.stack.pop()
+        self.write('</g>\n' * (self.state.groups - state.groups))
+        self.state = state
+        self._styles = {}
+
+    def savedState(self):
+        return SVGSavedState(self)
+
+    def _transform(self, matrix, txt):
+        a1, b1, c1, d1, e1, f1 = self.state.transform
+        a2, b2, c2, d2, e2, f2 = matrix
+        self.state.transform = (
+            a2 * a1 + b2 * c1,
+            a2 * b1 + b2 * d1,
+            c2 * a1 + d2 * c1,
+            c2 * b1 + d2 * d1,
+            e2 * a1 + f2 * c1 + e1,
+            e2 * b1 + f2 * d1 + f1,
+        )
+        self.state.groups += 1
+        self.write(f'<g transform="{txt}">\n')
+        # shadow offsets depend on the transformation
+        self._styles = {}
+
+    def translate(self, x=0, y=0):
+        self._transform((1, 0, 0, 1, x, y), f'translate({self._number(x)} {self._number(y)})')
+
+    def scale(self, x=1, y=None):
+        if y is None:
+            y = x
+        self._transform((x, 0, 0, y, 0, 0), f'scale({self._number(x)} {self._number(y)})')
+
+    def rotate(self, angle):
+        a = math.radians(angle)
+        self._transform((math.cos(a), math.sin(a), -math.sin(a), math.cos(a), 0, 0), f'rotate({self._number(angle)})')
+
+    def fill(self, *args):
+        self.state.fill = makeColor(args)
+        self.state.gradient = None
+        self._styles = {}
+
+    def stroke(self, *args):
+        self.state.stroke = makeColor(args)
+        self._styles = {}
+
+    def strokeWidth(self, value):
+        self.state.strokeWidth = value
+        self._styles = {}
+
+    def lineDash(self, *values):
+        self.state.lineDash = None if not values or values[0] is None else values
+        self._styles = {}
+
+    def lineCap(self, value):
+        self.state.lineCap = value
+        self._styles = {}
+
+    def font(self, fontName, fontSize=None):
+        self.state.font = fontName
+        if fontSize is not None:
+            self.state.fontSize = fontSize
+        self._styles = {}
+
+    def fontSize(self, value):
+        self.state.fontSize = value
+        self._styles = {}
+
+    def shadow(self, offset=None, blur=None, color=None):
+        if offset is None:
+            self.state.shadow = None
+        else:
+            self.state.shadow = tuple(offset), blur if blur is not None else 10, tuple(color) if color is not None else (0, 0.3)
+        self._styles = {}
+
+    def linearGradient(self, startPoint=None, endPoint=None, colors=None, locations=None):
+        if startPoint is None:
+            self.state.gradient = None
+        else:
+            key = 'gradient', tuple(startPoint), tuple(endPoint), tuple(tuple(color) for color in colors), tuple(locations)
+            self.state.gradient = self._define(key, self._writeGradient)
+        self._styles = {}
+
+    # -----------
+    # definitions
+    # -----------
+
+    def _newId(self, prefix):
+        self.definitionsCount += 1
+        return f'{prefix}{self.definitionsCount}'
+
+    def _define(self, key, writeFunc):
+        '''
+        Get the id of a definition, writing it to the document the first time it is used.
+
+        '''
+        definitionId = self.definitions.get(key)
+        if definitionId is None:
+            definitionId = self._newId(key[0][0])
+            self.write('<defs>')
+            writeFunc(definitionId, *key[1:])
+            self.write('</defs>\n')
+            self.definitions[key] = definitionId
+            if len(self.definitions) > self.definitionsCacheSize:
+                del self.definitions[next(iter(self.definitions))]
+        return definitionId
+
+    def _writeGradient(self, gradientId, startPoint, endPoint, colors, locations):
+        (x1, y1), (x2, y2) = startPoint, endPoint
+        n = self._number
+        self.write(f'<linearGradient id="{gradientId}" gradientUnits="userSpaceOnUse" x1="{n(x1)}" y1="{n(y1)}" x2="{n(x2)}" y2="{n(y2)}">')
+        for color, location in zip(colors, locations):
+            value, alpha = makeColor(color)
+            opacity = f' stop-opacity="{n(alpha)}"' if alpha != 1 else ''
+            self.write(f'<stop offset="{n(location)}" stop-color="{value}"{opacity}/>')
+        self.write('</linearGradient>')
+
+    def _writeShadow(self, shadowId, offset, blur, color):
+        n = self._number
+        dx, dy = offset
+        value, alpha = makeColor(color)
+        self.write(f'<filter id="{shadowId}" x="-50%" y="-50%" width="200%" height="200%">')
+        self.write(f'<feDropShadow dx="{n(dx)}" dy="{n(dy)}" stdDeviation="{n(blur * 0.5)}" flood-color="{value}" flood-opacity="{n(alpha)}"/>')
+        self.write('</filter>')
+
+    def _shadowId(self):
+        '''
+        Get a shadow filter for the current state.
+        Shadow offsets and blur are not affected by transformations, like in drawBot.
+
+        '''
+        (ox, oy), blur, color = self.state.shadow
+        a, b, c, d, e, f = self.state.transform
+        det = a * d - b * c
+        if not det:
+            return None
+        dx = (d * ox - c * oy) / det
+        dy = (a * oy - b * ox) / det
+        scale = math.sqrt(abs(det))
+        key = 'shadow', (round(dx, 3), round(dy, 3)), round(blur / scale, 3), color
+        return self._define(key, self._writeShadow)
+
+    # ------
+    # styles
+    # ------
+
+    def _style(self, kind):
+        '''
+        Get the presentation attributes of an element for the current state:
+        `shape` for filled and stroked shapes, `line` for stroked lines and `text` for filled text.
+
+        '''
+        style = self._styles.get(kind)
+        if style is not None:
+            return style
+
+        state = self.state
+        n = self._number
+        attributes = []
+        if kind == 'line':
+            attributes.append('fill="none"')
+        elif state.gradient is not None:
+            attributes.append(f'fill="url(#{state.gradient})"')
+        elif state.fill is None:
+            attributes.append('fill="none"')
+        else:
+            value, alpha = state.fill
+            attributes.append(f'fill="{value}"')
+            if alpha != 1:
+                attributes.append(f'fill-opacity="{n(alpha)}"')
+
+        if kind != 'text' and state.stroke is not None:
+            value, alpha = state.stroke
+            attributes.append(f'stroke="{value}" stroke-width="{n(state.strokeWidth)}"')
+            if alpha != 1:
+                attributes.append(f'stroke-opacity="{n(alpha)}"')
+            if state.lineDash:
+                attributes.append('stroke-dasharray="%s"' % ' '.join(n(value) for value in state.lineDash))
+            if state.lineCap:
+                attributes.append(f'stroke-linecap="{state.lineCap}"')
+
+        if kind == 'text':
+            if state.font:
+                attributes.append(f'font-family="{escapeText(state.font)}"')
+            attributes.append(f'font-size="{n(state.fontSize)}"')
+
+        if state.shadow is not None:
+            shadowId = self._shadowId()
+            if shadowId is not None:
+                attributes.append(f'filter="url(#{shadowId})"')
+
+        style = self._styles[kind] = ' '.join(attributes)
+        return style
+
+    # ----------
+    # primitives
+    # ----------
+
+    def rect(self, x, y, w, h):
+        n = self._number
+        self.write(f'<rect x="{n(x)}" y="{n(y)}" width="{n(w)}" height="{n(h)}" {self._style("shape")}/>\n')
+
+    def oval(self, x, y, w, h):
+        n = self._number
+        rx, ry = w * 0.5, h * 0.5
+        if rx == ry:
+            self.write(f'<circle cx="{n(x + rx)}" cy="{n(y + ry)}" r="{n(rx)}" {self._style("shape")}/>\n')
+        else:
+            self.write(f'<ellipse cx="{n(x + rx)}" cy="{n(y + ry)}" rx="{n(rx)}" ry="{n(ry)}" {self._style("shape")}/>\n')
+
+    def line(self, pt1, pt2):
+        if self.state.stroke is None:
+            return
+        n = self._number
+        (x1, y1), (x2, y2) = pt1, pt2
+        self.write(f'<line x1="{n(x1)}" y1="{n(y1)}" x2="{n(x2)}" y2="{n(y2)}" {self._style("line")}/>\n')
+
+    def drawPath(self, path):
+        if not path.commands:
+            return
+        d = path.d
+        style = self._style('shape')
+        if len(d) < self.symbolsMinLength:
+            self.write(f'<path d="{d}" {style}/>\n')
+            return
+
+        key = 'path', d
+        symbolId = self.symbolIds.get(key)
+        if symbolId is not None:
+            self.symbolIds.move_to_end(key)
+            self.write(f'<use xlink:href="#{symbolId}" {style}/>\n')
+            return
+
+        # the path itself has no style, so that it can be reused with other styles
+        symbolId = self._newId('p')
+        self.write(f'<g {style}><path id="{symbolId}" d="{d}"/></g>\n')
+        self._addSymbol(key, symbolId)
+
+    # -------
+    # symbols
+    # -------
+
+    def _addSymbol(self, key, symbolId):
+        self.symbolIds[key] = symbolId
+        while len(self.symbolIds) > self.symbolsCacheSize:
+            self.symbolIds.popitem(last=False)
+
+    def _drawingKey(self, key):
+        # shadows depend on the scale and rotation of the drawing
+        a, b, c, d, e, f = self.state.transform
+        return 'drawing', key, (round(a, 6), round(b, 6), round(c, 6), round(d, 6))
+
+    def useSymbol(self, key):
+        '''
+        Draw an earlier drawing with the same key again, in the current coordinates.
+        Returns `False` if there is no such drawing.
+
+        '''
+        key = self._drawingKey(key)
+        symbolId = self.symbolIds.get(key)
+        if symbolId is None:
+            return False
+        self.symbolIds.move_to_end(key)
+        self.write(f'<use xlink:href="#{symbolId}"/>\n')
+        return True
+
+    def beginSymbol(self, key):
+        '''
+        Start a drawing which can be reused with `useSymbol`. The drawing is written as usual.
+
+        '''
+        symbolId = self._newId('d')
+        self.symbolStack.append((self._drawingKey(key), symbolId))
+        self.write(f'<g id="{symbolId}">\n')
+        self.save()
+
+    def endSymbol(self):
+        self.restore()
+        self.write('</g>\n')
+        key, symbolId = self.symbolStack.pop()
+        self._addSymbol(key, symbolId)
+
+    def text(self, txt, position, align=None):
+        self._writeText(txt, position, align)
+
+    def _writeText(self, txt, position, align):
+        x, y = position
+        anchor = {'center': 'middle', 'right': 'end'}.get(align)
+        anchor = f' text-anchor="{anchor}"' if anchor else ''
+        n = self._number
+        # flip text back upright
+        self.write(f'<text transform="scale(1 -1)" x="{n(x)}" y="{n(-y)}"{anchor} {self._style("text")}>{escapeText(str(txt))}</text>\n')
+
+    def textBox(self, txt, box, align=None):
+        x, y, w, h = box
+        if align == 'center':
+            x += w * 0.5
+        elif align == 'right':
+            x += w
+        # place the baseline of the first line one font size below the top of the box
+        self._writeText(txt, (x, y + h - self.state.fontSize), align)
+
+
+class SVGSavedState:
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def __enter__(self):
+        self.backend.save()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.backend.restore()
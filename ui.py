@@ -1,7 +1,5 @@
-from importlib import reload
-import fontPartsMap
-reload(fontPartsMap)
-
+# fontPartsMap is not reloaded, so the map is kept between runs
+# and only the parts affected by a slider change are calculated again
 from fontPartsMap import FontPartsMapUI
 
 size(1000, 800)